@@ -0,0 +1,57 @@
+import re
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+import numpy as np
+import requests
+from bs4 import BeautifulSoup
+from utils.bench_extract import best_time
+from utils.dygraph import parse_dygraph
+from get_distribution import URL, RAW_RANGES, NEW_RANGES, aggregate
+
+
+def legacy_parse(html):
+    """What get_distribution.get_data used to do: soup, regex, eval and a dict per row."""
+    soup = BeautifulSoup(html, 'html.parser')
+    script = soup.find('script', string=re.compile(r'new Dygraph')).string
+    data_string = re.search(r'\[\[new Date\(".*?"\),.*?\]\]', script, re.DOTALL).group(0)
+    data = eval(data_string.replace('new Date', '').replace('(', '').replace(')', ''))
+
+    merged_data = {}
+    for row in data:
+        merged_data[row[0].replace('"', '')] = {
+            new_range: sum(row[1:][RAW_RANGES.index(old_range)] for old_range in old_ranges)
+            for new_range, old_ranges in NEW_RANGES.items()
+        }
+    return merged_data
+
+
+def tokenized_parse(html):
+    dates, values = parse_dygraph(html)
+    return dates, aggregate(values, {"default": NEW_RANGES})["default"].to_numpy()
+
+
+def same_result(merged_data, dates, buckets):
+    legacy = np.array([list(row.values()) for row in merged_data.values()], dtype=float)
+    return len(merged_data) == len(dates) and np.allclose(legacy, buckets, equal_nan=True)
+
+
+def run(html, repeat=5):
+    legacy_ms, merged_data = best_time(lambda: legacy_parse(html), repeat)
+    tokenized_ms, (dates, buckets) = best_time(lambda: tokenized_parse(html), repeat)
+
+    print(f"Payload: {len(html) / 1024:,.0f} KB, {len(dates):,} rows")
+    print(f"{'Legacy (soup + eval)':<24}{legacy_ms:>10.1f} ms")
+    print(f"{'Tokenizer':<24}{tokenized_ms:>10.1f} ms")
+    print(f"{'Speedup':<24}{legacy_ms / tokenized_ms:>10.1f}x")
+    print(f"Match: {'ok' if same_result(merged_data, dates, buckets) else 'MISMATCH'}")
+
+
+if __name__ == "__main__":
+    # python bench_distribution.py [saved_page.html] [repeat]; fetches the live page without a file
+    if len(sys.argv) > 1:
+        html = Path(sys.argv[1]).read_text(encoding="utf-8", errors="ignore")
+    else:
+        html = requests.get(URL).text
+
+    run(html, int(sys.argv[2]) if len(sys.argv) > 2 else 5)
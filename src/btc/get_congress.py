@@ -1,40 +1,72 @@
-import time
-import random
+import hashlib
+import requests
 from datetime import datetime, timedelta
-from bs4 import BeautifulSoup
-from selenium import webdriver
-import docker
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+from utils.browser import browser_session, close_sessions, fetch_pages, BROWSER_POOL_SIZE
+from utils.page_ready import wait_until_ready
+from utils.extract import CongressTrade, extract_congress_listings, extract_congress_trades
+from utils.local_cache import load_json, save_json
+from utils.page_archive import PAGE_REPLAY, archive_page, replay_page
 
 VOLUME_MIN = 1_000_000    # $1M minimum
+LISTING_URL = 'https://www.quiverquant.com/congresstrading/'
+HTTP_TIMEOUT = 15
+HTTP_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Gecko/20100101 Firefox/128.0",
+    "Accept": "text/html,application/xhtml+xml",
+}
+# A plain response is only used if it already carries what we parse
+HTTP_READY = {
+    "quiverquant_listing": lambda html: extract_congress_listings(html) is not None,
+    "quiverquant_trader": lambda html: bool(extract_congress_trades(html)),  # Listed politicians always have trades
+}
+TRADE_CACHE_FILE = "congress_trades.json"  # Per-politician latest trades, keyed by page link
 
 # Add this global variable at the top level of the file
 MOST_RECENT_TRADE_DATE = None
 
+def get_site(url):
+    return "quiverquant_listing" if url == LISTING_URL else "quiverquant_trader"
+
+def fetch_with_http(url):
+    """The page from a plain request, if its data is already in the raw HTML."""
+    try:
+        response = requests.get(url, headers=HTTP_HEADERS, timeout=HTTP_TIMEOUT)
+        if response.status_code == 200 and HTTP_READY[get_site(url)](response.text):
+            return response.text
+        print(f"Plain request for {url} has no data (HTTP {response.status_code}), using browser")
+    except requests.RequestException as e:
+        print(f"Plain request for {url} failed, using browser: {e}")
+    return None
+
+def fetch_page(url):
+    """Fetch a QuiverQuant page over plain HTTP first and with the browser only if needed."""
+    if PAGE_REPLAY:
+        return replay_page(url)
+
+    html_content = fetch_with_http(url)
+    if html_content:
+        archive_page(url, html_content, get_site(url))
+        return html_content
+    return fetch_data_with_firefox(url)
+
 def fetch_data_with_firefox(url, max_retries=5):
-    """Fetch data using existing Selenium WebDriver with retries."""
+    """Fetch data using a warm Selenium session with retries."""
+    site = get_site(url)
+    if PAGE_REPLAY:
+        return replay_page(url)
+
     for attempt in range(max_retries):
-        driver = None
         try:
-            driver = webdriver.Remote(
-                command_executor="http://localhost:4444/wd/hub",
-                options=webdriver.FirefoxOptions()
-            )
-            print(f"Loading page (attempt {attempt + 1}/{max_retries}): {url}")
-            driver.get(url)
-            wait_time = random.uniform(10, 20)  # Random wait between 10-20 seconds
-            print(f"Waiting {wait_time:.1f} seconds for page load...")
-            time.sleep(wait_time)
-            
-            html_content = driver.page_source
-            
-            if url == 'https://www.quiverquant.com/congresstrading/':
-                soup = BeautifulSoup(html_content, 'html.parser')
-                table_outers = soup.find_all("div", class_="table-outer")
-                if len(table_outers) >= 2 and table_outers[1].find('table'):
-                    return html_content
-            else:
-                if 'let tradeData = [' in html_content:
-                    return html_content
+            with browser_session("firefox") as driver:
+                print(f"Loading page (attempt {attempt + 1}/{max_retries}): {url}")
+                driver.get(url)
+                if wait_until_ready(driver, site, extend=False):  # We retry ourselves
+                    page_source = driver.page_source
+                    archive_page(url, page_source, site)
+                    return page_source
                 
             if attempt < max_retries - 1:
                 print("Retrying...")
@@ -48,27 +80,9 @@ def fetch_data_with_firefox(url, max_retries=5):
             else:
                 print("Max retries reached, giving up.")
                 return None
-        finally:
-            if driver:
-                driver.quit()
     
     return None
 
-def parse_trade_volume(volume_str):
-    """Convert trade volume string to numeric value"""
-    try:
-        clean_str = volume_str.replace('$', '').replace(',', '')
-        if 'B' in clean_str:
-            return float(clean_str.replace('B', '')) * 1_000_000_000
-        elif 'M' in clean_str:
-            return float(clean_str.replace('M', '')) * 1_000_000
-        elif 'K' in clean_str:
-            return float(clean_str.replace('K', '')) * 1_000
-        else:
-            return float(clean_str)
-    except:
-        return 0
-
 def format_name(raw_name):
     """Clean up politician name by removing whitespace and newlines."""
     return raw_name.strip().replace('\n', '').strip()
@@ -81,123 +95,121 @@ def format_link(relative_link):
     return f"{base_url}/{formatted_link}"
 
 
+# **📌 Per-politician Cache**
+def get_listing_hash(trade_info):
+    """Fingerprint of a politician's whole listing row; it changes when they report new trades.
+
+    Every cell counts: the displayed volume is rounded (e.g. "$12.3M"), so a small new
+    filing can leave it as it was while the trade count or last-traded date moves.
+    """
+    row = "|".join([trade_info['link'], *trade_info['cells']])
+    return hashlib.sha256(row.encode("utf-8")).hexdigest()
+
+
+def cache_entry(trade_info, trades):
+    """What we keep per politician: their latest trade date and the trades on it."""
+    last_trade_date = max((trade.date for trade in trades), default=None)
+    latest_trades = [
+        [trade.symbol, trade.trade_type, trade.date.strftime("%Y-%m-%d")]
+        for trade in trades
+        if trade.date == last_trade_date
+    ]
+    return {
+        'listing_hash': get_listing_hash(trade_info),
+        'last_trade_date': last_trade_date.strftime("%Y-%m-%d") if last_trade_date else None,
+        'trades': latest_trades,
+    }
+
+
+def cached_trades(entry):
+    return [
+        CongressTrade(symbol, trade_type, datetime.strptime(date, "%Y-%m-%d"))
+        for symbol, trade_type, date in entry['trades']
+    ]
+
+
+def get_most_recent_trades(results):
+    """Trades on the most recent date across all politicians, split into Buy and Sell.
+
+    `results` are (trade_info, trades) pairs in listing order, trades newest first.
+    """
+    results = [(trade_info, trades) for trade_info, trades in results if trades]
+    if not results:
+        return None, {'Buy': [], 'Sell': []}
+
+    most_recent_date = max(trade.date for _, trades in results for trade in trades)
+    print(f"Most recent trade date: {most_recent_date.strftime('%b %d, %Y')}")
+
+    trades_that_day = {'Buy': [], 'Sell': []}
+    for trade_info, trades in results:
+        for trade in trades:
+            if trade.date < most_recent_date:
+                break  # Remaining trades will be older
+            if trade.date == most_recent_date:
+                print(f"Adding trade for {trade_info['name']} - {trade.symbol} ({trade.trade_type}) on {trade.date.strftime('%b %d, %Y')}")
+                trades_that_day[trade.trade_type].append({
+                    'name': trade_info['name'],
+                    'symbol': trade.symbol
+                })
+    return most_recent_date, trades_that_day
+
+
 def get_congress_trades():
     """Get congressional trade insights showing trades from the most recent date."""
     try:
-        html_content = fetch_data_with_firefox('https://www.quiverquant.com/congresstrading/')
+        html_content = fetch_page(LISTING_URL)
         if not html_content:
             print("Could not fetch Quiver Quant data")
             return None
 
-        soup = BeautifulSoup(html_content, "html.parser")
-        
-        # Find all table-outer divs
-        table_outers = soup.find_all("div", class_="table-outer")
-        if len(table_outers) < 2:
+        listings = extract_congress_listings(html_content)
+        if listings is None:
             print("Could not find trades table")
             return None
 
-        # Get the second table
-        table = table_outers[1].find('table')
-        if not table:
-            print("Could not find table within second table-outer")
-            return None
-
-        rows = table.find_all('tr')[1:]  # Skip header row
-        all_trades = []
-
-        for row in rows:
-            try:
-                cols = row.find_all('td')
-                if not cols or len(cols) < 3:
-                    continue
-
-                politician_element = cols[0].find('a')
-                if not politician_element:
-                    continue
-
-                name_col = cols[0].find('strong')
-                if not name_col:
-                    continue
-                name = name_col.text.strip()
-                volume_text = cols[2].find('a').text.strip()
-                volume = parse_trade_volume(volume_text)
-
-                trade_info = {
-                    'link': format_link(politician_element['href']),
-                    'volume': volume,
-                    'name': name
-                }
-                if volume >= VOLUME_MIN:
-                    all_trades.append(trade_info)
-
-            except Exception as e:
-                continue
-
-        trades_that_day = {'Buy': [], 'Sell': []}
-        most_recent_date = None
-
+        all_trades = [
+            {
+                'link': format_link(listing.href),
+                'volume': listing.volume,
+                'name': listing.name,
+                'cells': listing.cells
+            }
+            for listing in listings
+            if listing.volume >= VOLUME_MIN
+        ]
+
+        # Politicians whose listing row hasn't changed since the last run reuse their cached trades;
+        # a replay reads every archived page and leaves the cache alone
+        trade_cache = {} if PAGE_REPLAY else load_json(TRADE_CACHE_FILE, {})
+        trades_by_link = {}
+        pending = set()
         for trade_info in all_trades:
-            html_content = fetch_data_with_firefox(trade_info['link'])
-            if not html_content:
+            entry = trade_cache.get(trade_info['link'])
+            if entry and entry['listing_hash'] == get_listing_hash(trade_info):
+                trades_by_link[trade_info['link']] = cached_trades(entry)
+            else:
+                pending.add(trade_info['link'])
+
+        # Politician pages load concurrently (QuiverQuant is rate limited per host), falling back to browsers
+        print(f"Fetching {len(pending)} of {len(all_trades)} politician pages with up to {BROWSER_POOL_SIZE} workers")
+        trade_info_by_link = {trade_info['link']: trade_info for trade_info in all_trades}
+        for link, html_content in fetch_pages(pending, fetch_page):
+            trades = extract_congress_trades(html_content) if html_content else None
+            if not trades:
+                # An empty page means parsing failed; caching it would skip the politician until their row changes
                 continue
+            trades_by_link[link] = trades
+            trade_cache[link] = cache_entry(trade_info_by_link[link], trades)
 
-            soup = BeautifulSoup(html_content, "html.parser")
-            trade_table = soup.find("table", {"id": "tradeTable"})
-            if not trade_table:
-                continue
+        if not PAGE_REPLAY:
+            try:
+                save_json(TRADE_CACHE_FILE, trade_cache)
+            except OSError as e:
+                print(f"Could not save congress trade cache: {e}")
 
-            trade_rows = trade_table.find_all("tr")[1:]  # Skip header
-            
-            for row in trade_rows:
-                try:
-                    tds = row.find_all("td")
-                    if not tds or len(tds) < 4:
-                        continue
-                        
-                    # Safely get symbol
-                    symbol_div = tds[0].find("div")
-                    if not symbol_div:
-                        continue
-                    symbol_a = symbol_div.find("a", class_="positive")
-                    if not symbol_a:
-                        continue
-                    symbol = symbol_a.text.strip()
-                    
-                    # Safely get date
-                    date_strong = tds[3].find("strong")
-                    if not date_strong:
-                        continue
-                    date = date_strong.text.strip()
-                    current_date = datetime.strptime(date, "%b %d, %Y")
-                    
-                    # Check if this is the most recent trade we've seen
-                    if most_recent_date is None or current_date > most_recent_date:
-                        print(f"Found newer trade: {trade_info['name']} - {current_date.strftime('%b %d, %Y')}")
-                        most_recent_date = current_date
-                        trades_that_day = {'Buy': [], 'Sell': []}  # Reset dictionary for new date
-                    
-                    if most_recent_date and current_date == most_recent_date:
-                        # Safely get trade type
-                        type_strong = tds[1].find("strong")
-                        if not type_strong:
-                            continue
-                        trade_type = "Buy" if type_strong.text == "Purchase" else "Sell"
-                        print(f"Adding trade for {trade_info['name']} - {symbol} ({trade_type}) on {current_date.strftime('%b %d, %Y')}")
-                        
-                        # Add trade to appropriate list
-                        trades_that_day[trade_type].append({
-                            'name': trade_info['name'],
-                            'symbol': symbol
-                        })
-                    elif current_date < most_recent_date:
-                        print(f"Found older trade: {trade_info['name']} - {current_date.strftime('%b %d, %Y')} (current newest: {most_recent_date.strftime('%b %d, %Y')})")
-                        break  # Break the inner loop as remaining trades will be older
-
-                except Exception as e:
-                    continue
-
-            time.sleep(random.uniform(1, 2))
+        most_recent_date, trades_that_day = get_most_recent_trades(
+            (trade_info, trades_by_link.get(trade_info['link'])) for trade_info in all_trades
+        )
 
         if trades_that_day['Buy'] or trades_that_day['Sell']:
             message = f"*Congress Traders* (Most Recent Trade - {most_recent_date.strftime('%b %d')})\n"
@@ -259,32 +271,8 @@ def format_congress_message(insights):
     return message.rstrip()
 
 def get_congress():
-    """Main function to run congress tracker with Docker lifecycle management."""
+    """Main function to run congress tracker on the shared browser service."""
     try:
-        # Start Docker container
-        client = docker.from_env()
-        container_name = "selenium-firefox"
-
-        # Clean up any existing container
-        try:
-            container = client.containers.get(container_name)
-            print(f"Found existing container {container_name}, removing it...")
-            container.stop()
-            container.remove()
-        except docker.errors.NotFound:
-            print(f"No existing container {container_name} found")
-
-        # Start new container
-        print(f"Starting new {container_name} container...")
-        client.containers.run(
-            "selenium/standalone-firefox",
-            name=container_name,
-            ports={"4444/tcp": 4444},
-            detach=True,
-        )
-        print("Docker container started")
-        time.sleep(3)  # Give container time to fully start
-
         # Get insights
         msg = get_congress_trades()
         
@@ -298,17 +286,8 @@ def get_congress():
         print(f"\nError in main process: {e}")
         return None
     finally:
-        # Clean up Docker container
-        try:
-            container = client.containers.get(container_name)
-            print(f"\nStopping and removing {container_name} container...")
-            container.stop()
-            container.remove()
-            print("Container cleanup completed")
-        except docker.errors.NotFound:
-            print(f"Container {container_name} already removed")
-        except Exception as e:
-            print(f"Error cleaning up container: {e}")
+        # Hand the sessions back so the browser service can idle out
+        close_sessions("firefox")
 
 if __name__ == "__main__":
     msg = get_congress()
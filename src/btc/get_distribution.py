@@ -1,11 +1,26 @@
-import re
 import pandas as pd
-from bs4 import BeautifulSoup
 from datetime import datetime, timedelta
 import requests
 import json
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+import numpy as np
+from utils.dygraph import parse_dygraph
+from utils.local_cache import CACHE_DIR, cache_path, load_json, save_json
+from utils.streaks import sign_runs, reversals
+from utils.anomalies import rolling_anomalies
 
 URL = "https://bitinfocharts.com/bitcoin-distribution-history.html"
+REQUEST_TIMEOUT = 30
+
+# Parsed raw history (dates + value matrix) and the validators of the response it came from
+HISTORY_FILE = "distribution/history.npz"
+HISTORY_META = "distribution/history.json"
+
+# Sorted history held for the rest of the process: raw (dates, values) and bucketed matrices
+_history = None
+_bucketed = {}
 
 RAW_RANGES = [
     "0 - 0.1 BTC",
@@ -25,86 +40,195 @@ NEW_RANGES = {
     "100+ BTC": ["100 - 1,000 BTC", "1,000 - 10,000 BTC", "10,000 - 100,000 BTC", "100,000 - 1,000,000 BTC"]
 }
 
+# Alternative ways to group RAW_RANGES; every bucketing is computed in the same pass
+BUCKETINGS = {
+    "default": NEW_RANGES,
+    "whale_tiers": {
+        "0 - 100 BTC": ["0 - 0.1 BTC", "0.1 - 1 BTC", "1 - 10 BTC", "10 - 100 BTC"],
+        "100 - 1,000 BTC": ["100 - 1,000 BTC"],
+        "1,000 - 10,000 BTC": ["1,000 - 10,000 BTC"],
+        "10,000+ BTC": ["10,000 - 100,000 BTC", "100,000 - 1,000,000 BTC"],
+    },
+}
+
+
+# **📌 History Cache**
+def load_history():
+    """Cached (dates, values), or None if nothing usable is cached."""
+    try:
+        with np.load(CACHE_DIR / HISTORY_FILE) as cached:
+            return cached["dates"].astype("datetime64[D]"), cached["values"]
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Ignoring unreadable distribution cache: {e}")
+        return None
+
+
+def save_history(dates, values, meta):
+    path = cache_path(HISTORY_FILE)
+    tmp_path = path.with_name(path.stem + ".tmp.npz")
+    np.savez(tmp_path, dates=dates.astype("int64"), values=values)
+    tmp_path.replace(path)
+    save_json(HISTORY_META, meta)
+
+
+def merge_history(cached, dates, values):
+    """Fetched rows win; cached rows older than the fetched range are kept.
+
+    Starts over if the column layout changed.
+    """
+    if cached is None or cached[1].shape[1] != values.shape[1]:
+        return dates, values
+    cached_dates, cached_values = cached
+    older = cached_dates < dates[0]
+    return (
+        np.concatenate([cached_dates[older], dates]),
+        np.concatenate([cached_values[older], values]),
+    )
+
+
+def fetch_history():
+    """Raw distribution history, refreshed with a conditional request.
+
+    Unchanged pages (304) cost no parsing; when the site is slow or down the last good
+    copy is served as is.
+    """
+    cached = load_history()
+    meta = load_json(HISTORY_META, {}) if cached is not None else {}
+
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+
+    try:
+        response = requests.get(URL, headers=headers, timeout=REQUEST_TIMEOUT)
+        if response.status_code == 304 and cached is not None:
+            print("Distribution history not modified, using cache")
+            return cached
+        if response.status_code != 200:
+            raise ConnectionError(f"HTTP {response.status_code}")
+
+        # Tokenize the Dygraph array straight into a date vector and a value matrix
+        dates, values = merge_history(cached, *parse_dygraph(response.text))
+    except Exception as e:
+        if cached is None:
+            raise ConnectionError(f"Could not fetch distribution history and nothing is cached: {e}")
+        print(f"Error fetching distribution history, using cached copy up to {cached[0][-1]}: {e}")
+        return cached
+
+    try:
+        save_history(dates, values, {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "last_date": str(dates[-1]),
+            "fetched_at": datetime.now().isoformat(timespec="seconds"),
+        })
+    except OSError as e:
+        print(f"Could not save distribution cache: {e}")
+    return dates, values
+
+
+# **📌 Bucket Aggregation**
+def aggregation_matrix(buckets):
+    """0/1 matrix (raw range x bucket) that sums each bucket's raw columns."""
+    matrix = np.zeros((len(RAW_RANGES), len(buckets)))
+    for column, old_ranges in enumerate(buckets.values()):
+        for old_range in old_ranges:
+            if old_range in RAW_RANGES:
+                matrix[RAW_RANGES.index(old_range), column] = 1
+    return matrix
+
+
+def aggregate(values, bucketings=BUCKETINGS):
+    """Apply every bucketing to the raw value matrix with a single multiply.
+
+    Returns {name: DataFrame of that bucketing's columns}. A bucket is NaN on dates where
+    any of its raw ranges is missing.
+    """
+    names = list(bucketings)
+    matrix = np.hstack([aggregation_matrix(bucketings[name]) for name in names])
+    raw = values[:, :len(RAW_RANGES)]
+    missing = np.isnan(raw)
+    combined = np.where(missing, 0, raw) @ matrix
+    combined[(missing @ matrix) > 0] = np.nan
+
+    aggregated = {}
+    offset = 0
+    for name in names:
+        columns = list(bucketings[name])
+        aggregated[name] = pd.DataFrame(combined[:, offset:offset + len(columns)], columns=columns)
+        offset += len(columns)
+    return aggregated
+
+
+# **📌 Date Range Queries**
+def get_history(refresh=False):
+    """Sorted raw (dates, values), loaded once per process.
+
+    The first call fetches when `refresh` is set and otherwise prefers the local cache, so
+    repeated queries (backtests, parameter sweeps) never touch the network.
+    """
+    global _history
+    if _history is None or refresh:
+        history = None if refresh else load_history()
+        dates, values = history if history is not None else fetch_history()
+        order = np.argsort(dates, kind="stable")
+        _history = dates[order], values[order]
+        _bucketed.clear()
+    return _history
+
+
+def get_bucketed_history(bucketing="default"):
+    """(dates, bucket matrix) for a bucketing, aggregated once per loaded history."""
+    dates, values = get_history()
+    if bucketing not in _bucketed:
+        _bucketed[bucketing] = aggregate(values, {bucketing: BUCKETINGS[bucketing]})[bucketing].to_numpy()
+    return dates, _bucketed[bucketing]
+
+
+def get_range(start_date=None, end_date=None, bucketing="default"):
+    """Dates and bucket rows in [start_date, end_date], sliced by binary search."""
+    dates, buckets = get_bucketed_history(bucketing)
+    start = 0 if start_date is None else np.searchsorted(dates, np.datetime64(pd.to_datetime(start_date).date()), side="left")
+    end = len(dates) if end_date is None else np.searchsorted(dates, np.datetime64(pd.to_datetime(end_date).date()), side="right")
+    return dates[start:end], buckets[start:end]
+
+
+def get_data_since(start_date, end_date=None, bucketing="default"):
+    """Bucketed history from `start_date` as a frame with a 'Date' column, for backtests."""
+    dates, buckets = get_range(start_date, end_date, bucketing)
+    df = pd.DataFrame(buckets, columns=list(BUCKETINGS[bucketing]))
+    df.insert(0, "Date", pd.to_datetime(dates))
+    return df
 
-def get_data(start_date=None, end_date=None):
-    response = requests.get(URL)
-    if response.status_code != 200:
-        exit()
-
-    soup = BeautifulSoup(response.content, 'html.parser')
-    script = soup.find('script', string=re.compile(r'new Dygraph')).string
-    data_string = re.search(r'\[\[new Date\(".*?"\),.*?\]\]', script, re.DOTALL).group(0)
-    data = eval(data_string.replace('new Date', '').replace('(', '').replace(')', ''))
-    
-    # Extract dates and values
-    dates = [row[0].replace('"', '') for row in data]
-    values = [row[1:] for row in data]
-    
-    # Create merged data dictionary
-    merged_data = {}
-    for date, value_row in zip(dates, values):
-        merged_data[date] = {
-            new_range: sum(value_row[RAW_RANGES.index(old_range)] 
-                          for old_range in old_ranges if old_range in RAW_RANGES)
-            for new_range, old_ranges in NEW_RANGES.items()
-        }
-    
-    # Create DataFrame
-    formatted_data = []
-    for date, values_dict in merged_data.items():
-        new_data = values_dict.copy()
-        new_data["Date"] = date
-        formatted_data.append(new_data)
-
-    df = pd.DataFrame(formatted_data)
-    df["Date"] = pd.to_datetime(df["Date"], format='%Y/%m/%d')
-    df = df.sort_values("Date").reset_index(drop=True)
-
-    if start_date is None:
-        start_date = df["Date"].min()
-    else:
-        start_date = pd.to_datetime(start_date)
-
-    if end_date is None:
-        end_date = datetime.now()
-    else:
-        end_date = pd.to_datetime(end_date)
-
-    mask = (df["Date"] >= start_date) & (df["Date"] <= end_date)
-    df = df[mask].reset_index(drop=True)
-    df.set_index("Date", inplace=True)
 
+def get_data(start_date=None, end_date=None, bucketing="default"):
+    get_history(refresh=True)
+    dates, buckets = get_range(start_date, end_date or datetime.now(), bucketing)
+    df = pd.DataFrame(buckets, columns=list(BUCKETINGS[bucketing]), index=pd.to_datetime(dates))
+    df.index.name = "Date"
     return df
 
 
 def get_reversal(df):
-    df = df.diff().iloc[1:]
+    runs = sign_runs(df.diff().iloc[1:])
+    reversed_yesterday = reversals(runs).iloc[-2]
     buying_reversals = {}
     selling_reversals = {}
 
     for category in NEW_RANGES.keys():
-        category_data = df[category]
-
-        yesterday_change = category_data.iloc[-2]
-        day_before_yesterday_change = category_data.iloc[-3]
-
-        yesterday_direction = "buying" if yesterday_change > 0 else "selling"
-        day_before_yesterday_direction = "buying" if day_before_yesterday_change > 0 else "selling"
-
-        if yesterday_direction != day_before_yesterday_direction:
-            streak_count = 1
-            for change in category_data.iloc[:-3].iloc[::-1]:
-                direction = "buying" if change > 0 else "selling" if change < 0 else None
-                if direction == day_before_yesterday_direction:
-                    streak_count += 1
-                else:
-                    break
-
-            if yesterday_direction == "buying":
-                buying_reversals[category] = streak_count
-            else:
-                selling_reversals[category] = streak_count
+        if not reversed_yesterday[category]:
+            continue
 
+        # Length of the run that yesterday's change broke
+        streak_count = runs.previous_length[category].iloc[-2]
+        if runs.sign[category].iloc[-2] > 0:
+            buying_reversals[category] = streak_count
+        else:
+            selling_reversals[category] = streak_count
 
     messages = []
     if buying_reversals:
@@ -128,29 +252,13 @@ def get_reversal(df):
 
 def get_streaks(df):
     msg = ""
-    df = df.diff().iloc[1:]
+    runs = sign_runs(df.diff().iloc[1:])
     streaks = {}
     for category in NEW_RANGES.keys():
-        category_data = df[category]
-        direction = None
-        streak_count = 0
-
-        for change in category_data.iloc[:-1].iloc[::-1]:
-            if change > 0:
-                if direction == "buying" or direction is None:
-                    direction = "buying"
-
-                    streak_count += 1
-                else:
-                    break
-            elif change < 0:
-                if direction == "selling" or direction is None:
-                    direction = "selling"
-                    streak_count += 1
-                else:
-                    break
-            else:
-                break
+        # Run of same-direction changes ending yesterday
+        sign = runs.sign[category].iloc[-2]
+        direction = "buying" if sign > 0 else "selling" if sign < 0 else None
+        streak_count = runs.length[category].iloc[-2] if direction else 0
 
         streaks[category] = (direction, streak_count)
 
@@ -171,30 +279,18 @@ def get_streaks(df):
 
 def get_sudden_change(df, window_size=30, std_multiplier=1):
     df = df.diff().iloc[1:]
+    # Full anomaly series; the message only needs yesterday's row
+    anomalies = rolling_anomalies(df, window_size, std_multiplier)
     yesterday = df.iloc[-2] #DEMO should be -2
-    df = df.iloc[-(window_size + 2):-2]
     messages = []
     for category in NEW_RANGES.keys():
-        # Calculate rolling stats for buying
-        category_data = df[category]
-        buying_data = category_data[category_data > 0]
-        selling_data = abs(category_data[category_data < 0])  # Absolute value for selling
-
-        # Rolling mean and std for buying
-        buying_mean = buying_data.mean()
-        buying_std = buying_data.std()
-        buying_threshold = buying_mean + (std_multiplier * buying_std)
-
-        # Rolling mean and std for selling
-        selling_mean = selling_data.mean()
-        selling_std = selling_data.std()
-        selling_threshold = selling_mean + (std_multiplier * selling_std)
-
-        # Check yesterday's value against thresholds
+        flag = anomalies.flag[category].iloc[-2]
         value_yesterday = yesterday[category]
-        if value_yesterday > 0 and value_yesterday > buying_threshold:
+        if flag > 0:
+            buying_mean = anomalies.rise_mean[category].iloc[-2]
             messages.append(f"{category} increased their holdings by *{value_yesterday:.0f} BTC*, well above their monthly average of {buying_mean:.0f} BTC.")
-        elif value_yesterday < 0 and abs(value_yesterday) > selling_threshold:
+        elif flag < 0:
+            selling_mean = anomalies.fall_mean[category].iloc[-2]
             messages.append(f"{category} decreased their holdings by *{abs(value_yesterday):.0f} BTC*, well above their monthly average of {selling_mean:.0f} BTC.")
 
     return "\n".join(messages) if messages else "No sudden increase/decrease in holdings detected."
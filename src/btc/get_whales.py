@@ -1,32 +1,32 @@
 import time
-import pymysql
-from datetime import datetime, timedelta
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.firefox.service import Service as FirefoxService
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.firefox import GeckoDriverManager
+from datetime import datetime
 from dotenv import load_dotenv
 import os
-import docker
-from time import sleep
+import sys
+import csv
+import json
+from itertools import chain
+import math
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+import numpy as np
 import pandas as pd
-import ccxt
+from utils.database import get_connection, transaction, initialize_schema
+from utils.browser import browser_session, close_sessions, fetch_pages, add_preload_script, BROWSER_POOL_SIZE
+from utils.page_ready import wait_until_ready
+from utils.extract import extract_arkham_holdings, parse_amount
+from utils.prices import get_prices
+from utils.page_archive import PAGE_REPLAY, archive_page, load_page, replay_page, iter_archive, snapshot_date
+from utils.holding_changes import holdings_matrix, compute_changes, top_movers, horizon_changes
 
 # Load environment variables
 load_dotenv()
 
-# MySQL Connection Details from .env
-DB_HOST = os.getenv('DB_HOST')
-DB_USER = os.getenv('DB_USER')
-DB_PASSWORD = os.getenv('DB_PASSWORD')
-DB_NAME = os.getenv('DB_NAME')
-DB_PORT = int(os.getenv('DB_PORT', 3306))
-
 TOP_MARKET_SYMBOLS = ['BTC', 'ETH', 'XRP', 'BNB', 'SOL'] #USDT, USDC, WETH
 MUST_SYMBOLS = ['BTC', 'ETH']
+TRACKED_SYMBOLS = TOP_MARKET_SYMBOLS  # Symbols considered for insights; None tracks every held asset
+HISTORY_DAYS = 31  # get_max_changes looks back at most about a month
+INSIGHT_HORIZONS = (7, 30)  # Days of net change shown next to each day-over-day change
 
 # Base URL for all entities
 BASE_URL = "https://intel.arkm.com/explorer/entity/"
@@ -114,398 +114,597 @@ USER_AGENTS = [
 
 DEFAULT_ASSETS = {"ETH", "WETH"}
 
-# **📌 Connect to MySQL**
-def connect_to_database():
-    """Connect to MySQL database."""
-    try:
-        return pymysql.connect(
-            host=DB_HOST,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_NAME,
-            port=DB_PORT,
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor
+# "network" reads holdings from the JSON the Arkham page fetches, "dom" parses the rendered table
+WHALE_FETCH_MODE = os.getenv("WHALE_FETCH_MODE", "network")
+ARKHAM_HOLDINGS_API = "/balances/entity/"
+NETWORK_CAPTURE_TIMEOUT = 15
+
+# Installed before navigation: keeps the body of the page's own holdings response (fetch or XHR),
+# so nothing is requested twice and the app's request headers don't matter
+HOLDINGS_HOOK_SCRIPT = """() => {
+    const pattern = %s;
+    const keep = (body) => {
+        try {
+            window.__arkhamHoldings = typeof body === "string" ? JSON.parse(body) : body;
+        } catch (e) {}
+    };
+    const originalFetch = window.fetch;
+    window.fetch = function () {
+        return originalFetch.apply(this, arguments).then((response) => {
+            if (response.ok && response.url.indexOf(pattern) !== -1) {
+                response.clone().text().then(keep, () => {});
+            }
+            return response;
+        });
+    };
+    const originalOpen = XMLHttpRequest.prototype.open;
+    XMLHttpRequest.prototype.open = function (method, url) {
+        if (String(url).indexOf(pattern) !== -1) {
+            this.addEventListener("load", () => {
+                if (this.status >= 200 && this.status < 300) {
+                    keep(this.responseType === "json" ? this.response : this.responseText);
+                }
+            });
+        }
+        return originalOpen.apply(this, arguments);
+    };
+}""" % json.dumps(ARKHAM_HOLDINGS_API)
+
+# Waits until the hook has seen the holdings response and hands its JSON back
+CAPTURE_HOLDINGS_SCRIPT = """
+var deadline = Date.now() + arguments[0] * 1000;
+var done = arguments[arguments.length - 1];
+(function poll() {
+    if (window.__arkhamHoldings) {
+        done(window.__arkhamHoldings);
+    } else if (Date.now() > deadline) {
+        done(null);
+    } else {
+        setTimeout(poll, 250);
+    }
+})();
+"""
+
+# Long-format holdings store: one row per (entity, date, symbol)
+HOLDINGS_TABLE = "entity_holdings"
+MIGRATION_BATCH_SIZE = 5000
+UPSERT_HOLDINGS = f"""
+    INSERT INTO {HOLDINGS_TABLE} (entity, date, symbol, amount)
+    VALUES (%s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE amount = VALUES(amount)
+"""
+
+# Rolling per-entity copy of the last WINDOW_DAYS days with precomputed deltas; insights read only this
+WINDOW_TABLE = "entity_holdings_window"
+WINDOW_DAYS = HISTORY_DAYS
+WINDOW_HORIZONS = (1, 7, 30)  # Days, stored as change_1d, change_7d, change_30d; must cover INSIGHT_HORIZONS
+
+# Limits of the symbol VARCHAR(64) and amount DECIMAL(32,4) columns; rows beyond them would fail the whole upsert
+MAX_SYMBOL_LENGTH = 64
+MAX_AMOUNT = 10 ** 28
+
+# Columns of every `*_holdings*` table, read in one query and cached for the run
+_table_catalog = None
+
+# **📌 Database Schema**
+def initialize_database():
+    """Create the long-format holdings table once per process."""
+    initialize_schema(HOLDINGS_TABLE, [f"""
+        CREATE TABLE IF NOT EXISTS {HOLDINGS_TABLE} (
+            entity VARCHAR(64) NOT NULL,
+            date DATE NOT NULL,
+            symbol VARCHAR(64) COLLATE utf8mb4_bin NOT NULL,
+            amount DECIMAL(32,4) NOT NULL,
+            PRIMARY KEY (entity, date, symbol),
+            KEY idx_entity_symbol_date (entity, symbol, date)
         )
-    except Exception as e:
-        print(f"❌ MySQL Connection Error: {e}")
-        return None
+    """, f"""
+        CREATE TABLE IF NOT EXISTS {WINDOW_TABLE} (
+            entity VARCHAR(64) NOT NULL,
+            date DATE NOT NULL,
+            symbol VARCHAR(64) COLLATE utf8mb4_bin NOT NULL,
+            amount DECIMAL(32,4) NOT NULL,
+            {', '.join(f"change_{horizon}d DECIMAL(32,4) NULL" for horizon in WINDOW_HORIZONS)},
+            deltas_computed BOOLEAN NOT NULL DEFAULT FALSE,
+            PRIMARY KEY (entity, date, symbol)
+        )
+    """])
+    invalidate_table_catalog()
+    upgrade_window_table()
 
-def check_and_create_table(cursor, table_name, existing_tables, existing_columns):
-    """Check if table exists and create if it doesn't. Return True if table exists/created."""
-    try:
-        # First check if table exists
-        cursor.execute(f"SHOW TABLES LIKE '{table_name}'")
-        table_exists = cursor.fetchone() is not None
-        
-        if not table_exists:
-            print(f"Table {table_name} doesn't exist, creating it")
-            create_query = f"""
-                CREATE TABLE IF NOT EXISTS {table_name} (
-                    date DATE NOT NULL PRIMARY KEY
-                )
-            """
-            cursor.execute(create_query)
-        
-        # Now get columns regardless of whether table was just created or existed
-        cursor.execute(f"SHOW COLUMNS FROM {table_name}")
-        columns = {row['Field'] for row in cursor.fetchall()}
-        existing_tables.append(table_name)
-        existing_columns.update(columns)
-        print(f"Found table {table_name}")
-        return True
-    except Exception as e:
-        print(f"Error checking/creating table {table_name}: {e}")
-        return False
+def upgrade_window_table():
+    """Add the deltas_computed flag to window tables created before it existed."""
+    with transaction() as cursor:
+        if 'deltas_computed' not in get_table_catalog(cursor).get(WINDOW_TABLE, {'deltas_computed'}):
+            cursor.execute(f"ALTER TABLE {WINDOW_TABLE} ADD COLUMN deltas_computed BOOLEAN NOT NULL DEFAULT FALSE")
+            invalidate_table_catalog()
+
+def get_entity_key(entity_config):
+    """Entity identifier used in the holdings table (e.g. 'blackrock')."""
+    return entity_config['table'].removesuffix('_holdings')
+
+def get_table_catalog(cursor):
+    """Return {table_name: set(columns)} for all holdings tables, cached until invalidated."""
+    global _table_catalog
+    if _table_catalog is None:
+        cursor.execute("""
+            SELECT TABLE_NAME AS table_name, COLUMN_NAME AS column_name
+            FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME LIKE %s
+        """, ('%\\_holdings%',))
+        catalog = {}
+        for row in cursor.fetchall():
+            catalog.setdefault(row['table_name'], set()).add(row['column_name'])
+        _table_catalog = catalog
+    return _table_catalog
+
+def invalidate_table_catalog():
+    """Drop the cached catalog; call after CREATE/ALTER/DROP on holdings tables."""
+    global _table_catalog
+    _table_catalog = None
 
 def get_table_info(cursor, entity_config):
-    """Get all tables and their columns for an entity. Returns (existing_tables, table_columns)."""
+    """Get all legacy sharded tables and their columns for an entity. Returns (existing_tables, table_columns)."""
+    catalog = get_table_catalog(cursor)
     existing_tables = []
     table_columns = {}
     
-    # Check numbered tables
+    # Numbered tables are consecutive: {table}1, {table}2, ...
     table_num = 1
-    while True:
+    while f"{entity_config['table']}{table_num}" in catalog:
         table_name = f"{entity_config['table']}{table_num}"
-        try:
-            cursor.execute(f"SHOW COLUMNS FROM {table_name}")
-            columns = {row['Field'] for row in cursor.fetchall()}
-            if 'date' in columns:
-                columns.remove('date')
-            existing_tables.append(table_name)
-            table_columns[table_name] = columns
-            table_num += 1
-        except Exception:
-            break
+        existing_tables.append(table_name)
+        table_columns[table_name] = catalog[table_name] - {'date'}
+        table_num += 1
             
     return existing_tables, table_columns
 
-def create_tables_if_not_exist(entity_config, html_content=None):
-    """Create tables for entity if they don't exist."""
-    print(f"\nChecking tables for {entity_config['title']}")
-    
-    # Fetch data if not provided
-    if not html_content:
-        html_content = fetch_data_with_firefox(entity_config['url'])
-        if not html_content:
-            print("Unable to fetch data from website")
-            return None
-        print("Successfully fetched HTML content")
-    
-    connection = connect_to_database()
-    if not connection:
-        return None
-
+# **📌 Fetch Data with Selenium**
+def capture_holdings_from_network(driver, url):
+    """Read the holdings JSON the Arkham page received (needs HOLDINGS_HOOK_SCRIPT). Returns {symbol: amount} or None."""
     try:
-        with connection.cursor() as cursor:
-            # Get crypto list from HTML
-            soup = BeautifulSoup(html_content, "html.parser")
-            holdings_containers = soup.find_all("div", class_="Portfolio_holdingsContainer__XyaUq")
-            crypto_list = []
-            
-            for container in holdings_containers:
-                symbol_span = container.find("span", class_="Portfolio_holdingsSymbol__uOpkQ")
-                if symbol_span:
-                    symbol = symbol_span.get_text(strip=True)
-                    if symbol not in crypto_list:
-                        crypto_list.append(symbol)
-
-            print(f"Found {len(crypto_list)} unique cryptocurrencies")
-            
-            # Get existing tables and columns
-            existing_tables, table_columns = get_table_info(cursor, entity_config)
-            
-            # Get all existing cryptos across all tables
-            all_existing_cryptos = set()
-            for columns in table_columns.values():
-                all_existing_cryptos.update(columns)
-            
-            # Find new cryptocurrencies
-            new_cryptos = [crypto for crypto in crypto_list if crypto not in all_existing_cryptos]
-            
-            if new_cryptos:
-                print(f"Found {len(new_cryptos)} new cryptocurrencies to add")
-                
-                if not existing_tables:
-                    # Calculate how many tables we need for new cryptos
-                    num_tables_needed = (len(new_cryptos) // 500) + (1 if len(new_cryptos) % 500 > 0 else 0)
-                    print(f"Creating {num_tables_needed} new tables")
-                    
-                    # Create all needed tables
-                    for table_num in range(num_tables_needed):
-                        start_idx = table_num * 500
-                        end_idx = min((table_num + 1) * 500, len(new_cryptos))
-                        table_cryptos = new_cryptos[start_idx:end_idx]
-                        
-                        table_name = f"{entity_config['table']}{table_num + 1}"
-                        create_query = f"""
-                            CREATE TABLE IF NOT EXISTS {table_name} (
-                                date DATE NOT NULL PRIMARY KEY,
-                                {', '.join(f'`{symbol}` DECIMAL(32,4)' for symbol in table_cryptos)}
-                            )
-                        """
-                        cursor.execute(create_query)
-                        connection.commit()
-                        print(f"Created {table_name} with {len(table_cryptos)} columns")
-                        
-                        existing_tables.append(table_name)
-                        table_columns[table_name] = set(table_cryptos)
-                else:
-                    # Add to existing tables logic (unchanged)
-                    last_table = existing_tables[-1]
-                    last_table_columns = len(table_columns[last_table])
-                    
-                    for symbol in new_cryptos:
-                        if last_table_columns >= 500:
-                            new_table = f"{entity_config['table']}{len(existing_tables) + 1}"
-                            create_query = f"""
-                                CREATE TABLE IF NOT EXISTS {new_table} (
-                                    date DATE NOT NULL PRIMARY KEY
-                                )
-                            """
-                            cursor.execute(create_query)
-                            connection.commit()
-                            existing_tables.append(new_table)
-                            table_columns[new_table] = set()
-                            last_table = new_table
-                            last_table_columns = 0
-                        
-                        try:
-                            cursor.execute(f"""
-                                ALTER TABLE {last_table}
-                                ADD COLUMN `{symbol}` DECIMAL(32,4)
-                            """)
-                            connection.commit()
-                            print(f"Added column {symbol} to {last_table}")
-                            last_table_columns += 1
-                            table_columns[last_table].add(symbol)
-                        except Exception as e:
-                            if "Duplicate column" not in str(e):
-                                print(f"Error adding column {symbol} to {last_table}: {e}")
-            else:
-                print("No new cryptocurrencies to add")
-            
-            return html_content, existing_tables, table_columns
-            
+        driver.set_script_timeout(NETWORK_CAPTURE_TIMEOUT + 5)
+        payload = driver.execute_async_script(CAPTURE_HOLDINGS_SCRIPT, NETWORK_CAPTURE_TIMEOUT)
+        holdings_data = parse_holdings_json(payload)
+        if holdings_data:
+            # Archived next to the page url so replay can parse the same payload
+            archive_page(f"{url}#balances", json.dumps(payload), "arkham_network")
+        return holdings_data
     except Exception as e:
-        print(f"Error managing tables: {e}")
+        print(f"Network capture error: {e}")
         return None
-    finally:
-        connection.close()
 
-# **📌 Fetch Data with Selenium**
-def fetch_data_with_firefox(url):
-    """Fetch data using existing Selenium WebDriver."""
-    driver = None
+def fetch_entity_holdings(url):
+    """Fetch an entity's holdings as {symbol: amount}, from network capture or the rendered DOM."""
+    if PAGE_REPLAY:
+        payload = load_page(f"{url}#balances")
+        if payload:
+            return parse_holdings_json(json.loads(payload))
+        return extract_holdings_and_value(replay_page(url))
+
     try:
-        driver = webdriver.Remote(
-            command_executor="http://localhost:4444/wd/hub",
-            options=webdriver.FirefoxOptions()
-        )
-        print(f"Loading page: {url}")
-        driver.get(url)
-        time.sleep(5)  # Give page time to load
-        return driver.page_source
+        with browser_session("firefox") as driver:
+            # The hook has to be in place before the page's scripts run
+            capture = WHALE_FETCH_MODE == "network" and add_preload_script(driver, HOLDINGS_HOOK_SCRIPT)
+            print(f"Loading page: {url}")
+            driver.get(url)
+
+            if capture:
+                holdings_data = capture_holdings_from_network(driver, url)
+                if holdings_data:
+                    print(f"Captured {len(holdings_data)} holdings from network")
+                    return holdings_data
+                print("Network capture failed, falling back to DOM")
+
+            wait_until_ready(driver, "arkham")
+            html_content = driver.page_source
+            archive_page(url, html_content, "arkham")
     except Exception as e:
         print(f"Error fetching data: {e}")
         return None
-    finally:
-        if driver:
-            driver.quit()
+
+    return extract_holdings_and_value(html_content)
 
 # **📌 Extract Data**
-def extract_holdings_and_value(html_content):
-    """Extract holdings from HTML content."""
-    if not html_content:
-        print("No HTML content to parse")
+def parse_holdings_json(payload):
+    """Sum Arkham per-chain balances ({"balances": {chain: [{symbol, balance}]}}) into {symbol: amount}."""
+    if not isinstance(payload, dict) or not isinstance(payload.get("balances"), dict):
         return None
 
-    soup = BeautifulSoup(html_content, "html.parser")
     holdings_data = {}
-    processed_symbols = set()
-
-    # Find all holdings containers
-    holdings_containers = soup.find_all("div", class_="Portfolio_holdingsContainer__XyaUq")
-    print(f"Found {len(holdings_containers)} holdings containers")
-
-    for container in holdings_containers:
-        try:
-            # Get symbol first
-            symbol_span = container.find("span", class_="Portfolio_holdingsSymbol__uOpkQ")
-            if not symbol_span:
-                continue
-            symbol = symbol_span.get_text(strip=True)
-
-            # Skip if we've already processed this symbol
-            if symbol in processed_symbols:
+    for chain_balances in payload["balances"].values():
+        for token in chain_balances or []:
+            symbol = str(token.get("symbol") or "").strip()  # Same casing as the DOM path
+            amount = token.get("balance")
+            if not isinstance(amount, (int, float)) or amount < 0 or not fits_holdings_columns(symbol, amount):
                 continue
+            holdings_data[symbol] = holdings_data.get(symbol, 0) + amount
 
-            # Get amount (first span in container)
-            amount_span = container.find("span")
-            if not amount_span:
-                continue
-            amount_text = amount_span.get_text(strip=True)
+    return holdings_data or None
 
-            # Convert B/M/K/T values to full numbers
-            try:
-                # Remove commas first
-                clean_amount = amount_text.replace(",", "")
-                
-                # Handle different suffixes
-                if clean_amount.endswith('T'):
-                    number = float(clean_amount[:-1])
-                    amount = number * 1_000_000_000_000
-                elif clean_amount.endswith('B'):
-                    number = float(clean_amount[:-1])
-                    amount = number * 1_000_000_000
-                elif clean_amount.endswith('M'):
-                    number = float(clean_amount[:-1])
-                    amount = number * 1_000_000
-                elif clean_amount.endswith('K'):
-                    number = float(clean_amount[:-1])
-                    amount = number * 1_000
-                else:
-                    amount = float(clean_amount)
-
-                # Validate the converted amount
-                if not isinstance(amount, (int, float)):
-                    print(f"Invalid amount type for {symbol}: {type(amount)}")
-                    continue
-                if amount < 0:
-                    print(f"Negative amount for {symbol}: {amount}")
-                    continue
-
-                holdings_data[symbol] = amount
-                processed_symbols.add(symbol)
-
-            except ValueError as e:
-                print(f"Error converting amount for {symbol}: {amount_text} - {str(e)}")
-                continue
-            except Exception as e:
-                print(f"Error processing {symbol}: {str(e)}")
-                continue
+def fits_holdings_columns(symbol, amount):
+    """Whether a (symbol, amount) pair can be stored in the holdings tables as is."""
+    return 0 < len(symbol) <= MAX_SYMBOL_LENGTH and math.isfinite(amount) and abs(amount) < MAX_AMOUNT
 
-        except Exception as e:
-            print(f"Error processing container: {str(e)}")
-            continue
+def extract_holdings_and_value(html_content):
+    """Extract holdings from HTML content."""
+    if not html_content:
+        print("No HTML content to parse")
+        return None
 
-    if not holdings_data:
+    holdings = extract_arkham_holdings(html_content)
+    if not holdings:
         print("No valid holdings data extracted")
         return None
 
-    print(f"Successfully extracted {len(holdings_data)} holdings")
-    return holdings_data
+    print(f"Successfully extracted {len(holdings)} holdings")
+    return {holding.symbol: holding.amount for holding in holdings}
 
 # **📌 Save Data to MySQL**
-def save_data_to_mysql(entity_config, holdings_data, existing_tables=None, table_columns=None):
-    """Save data using appropriate table structure."""
+def save_data_to_mysql(entity_config, holdings_data, date=None):
+    """Upsert one snapshot of holdings as (entity, date, symbol, amount) rows."""
     if not holdings_data:
         print("No holdings data to save")
         return
 
-    connection = connect_to_database()
-    if not connection:
-        return
-
-    today_date = datetime.now().strftime("%Y-%m-%d")
-    print(f"Saving data for date: {today_date}")
+    date = date or datetime.now().strftime("%Y-%m-%d")
+    entity = get_entity_key(entity_config)
+    print(f"Saving data for date: {date}")
     
     try:
-        with connection.cursor() as cursor:
-            # Get table info if not provided
-            if not existing_tables or not table_columns:
-                existing_tables, table_columns = get_table_info(cursor, entity_config)
-
-            # Save data to appropriate tables
-            for table_name in existing_tables:
-                # Filter holdings data for this table's columns
-                table_holdings = {k: v for k, v in holdings_data.items() 
-                                if k in table_columns[table_name]}
-                
-                if table_holdings:
-                    # Prepare column names and values
-                    columns = ["date"] + list(table_holdings.keys())
-                    values = [today_date] + list(table_holdings.values())
-                    
-                    # Create placeholders and update string
-                    placeholders = ", ".join(["%s"] * len(columns))
-                    columns_str = ", ".join(f"`{col}`" for col in columns)
-                    update_str = ", ".join(
-                        f"`{col}` = VALUES(`{col}`)" 
-                        for col in columns 
-                        if col != "date"
-                    )
-
-                    query = f"""
-                        INSERT INTO {table_name} ({columns_str})
-                        VALUES ({placeholders})
-                        ON DUPLICATE KEY UPDATE {update_str}
-                    """
-                    
-                    cursor.execute(query, values)
-                    connection.commit()
-                    print(f"Successfully saved data to {table_name}")
+        with transaction() as cursor:
+            rows = [
+                (entity, date, symbol, amount)
+                for symbol, amount in holdings_data.items()
+                if fits_holdings_columns(symbol, amount)
+            ]
+            if len(rows) < len(holdings_data):
+                print(f"Skipped {len(holdings_data) - len(rows)} holdings that don't fit {HOLDINGS_TABLE}")
+            # executemany collapses this into multi-row INSERT statements
+            cursor.executemany(UPSERT_HOLDINGS, rows)
+        print(f"Successfully saved {len(rows)} holdings to {HOLDINGS_TABLE}")
     
     except Exception as e:
         print(f"MySQL Save Error: {e}")
-        connection.rollback()
-    finally:
-        connection.close()
+
+def has_data_for_date(cursor, entity_config, date):
+    """Check whether a snapshot exists for the entity on the given date."""
+    cursor.execute(f"""
+        SELECT 1 FROM {HOLDINGS_TABLE}
+        WHERE entity = %s AND date = %s
+        LIMIT 1
+    """, (get_entity_key(entity_config), date))
+    return cursor.fetchone() is not None
 
 # **📌 Load Data for Comparison**
-def load_data_from_mysql(entity_config):
-    """Load data from all tables for an entity."""
-    connection = connect_to_database()
-    if not connection:
+def load_data_from_mysql(entity_config, symbols=None, days=None, before=None):
+    """Load an entity's history as one row dict per date ({'date': ..., symbol: amount}), newest first.
+
+    Only the given symbols and the last `days` days (before the `before` date, if given)
+    are read; None means all.
+    """
+    conditions = ["entity = %s"]
+    params = [get_entity_key(entity_config)]
+    if symbols:
+        conditions.append(f"symbol IN ({', '.join(['%s'] * len(symbols))})")
+        params.extend(symbols)
+    if before:
+        conditions.append("date < %s")
+        params.append(before)
+    if days:
+        conditions.append(f"date >= {'%s' if before else 'CURDATE()'} - INTERVAL %s DAY")
+        params.extend([before, days] if before else [days])
+
+    try:
+        with get_connection() as connection, connection.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT date, symbol, amount
+                FROM {HOLDINGS_TABLE}
+                WHERE {' AND '.join(conditions)}
+                ORDER BY date DESC
+            """, params)
+
+            return pivot_rows(cursor.fetchall())
+    except Exception as e:
+        print(f"MySQL Load Error: {e}")
         return []
 
+def pivot_rows(rows, symbols=None):
+    """Group (date, symbol, amount) rows into one dict per date, keeping their order."""
+    rows_by_date = {}
+    for row in rows:
+        if symbols and row['symbol'] not in symbols:
+            continue
+        day = rows_by_date.setdefault(row['date'], {'date': row['date']})
+        day[row['symbol']] = row['amount']
+    return list(rows_by_date.values())
+
+# **📌 Rolling Holdings Window**
+def get_window_deltas(rows, date, symbols=None):
+    """Change of each symbol on `date` over every WINDOW_HORIZONS horizon, as {horizon: {symbol: delta}}.
+
+    `rows` are the entity's window rows; deltas without a baseline are None.
+    """
+    history = pivot_rows(sorted(rows, key=lambda row: row['date']), symbols)
+    if not history or history[-1]['date'] != date:
+        return {}
+
+    columns = sorted({symbol for day in history for symbol in day if symbol != 'date'})
+    matrix = np.array([[float(day.get(symbol, np.nan)) for symbol in columns] for day in history])
+    changes = horizon_changes([day['date'] for day in history], matrix, WINDOW_HORIZONS)
+    present = ~np.isnan(matrix[-1])
+    return {
+        horizon: {
+            symbol: None if np.isnan(delta) else float(delta)
+            for symbol, delta, keep in zip(columns, change, present) if keep
+        }
+        for horizon, change in changes.items()
+    }
+
+def stored_window_deltas(rows, date):
+    """The deltas saved on the day's window rows, or None if any row still has to be computed.
+
+    deltas_computed tells a stored NULL (no baseline that far back) from deltas not computed yet.
+    """
+    day_rows = [row for row in rows if row['date'] == date]
+    if not day_rows or not all(row['deltas_computed'] for row in day_rows):
+        return None
+    return {
+        horizon: {
+            row['symbol']: None if row[f"change_{horizon}d"] is None else float(row[f"change_{horizon}d"])
+            for row in day_rows
+        }
+        for horizon in WINDOW_HORIZONS
+    }
+
+def refresh_holdings_window(entity_config, symbols=None, date=None):
+    """Bring the entity's window up to `date` and return (rows like load_data_from_mysql, deltas).
+
+    Only the window is touched: expired days are dropped, days missing from it (all of them
+    on the first run) are copied from the holdings table, and the day's deltas are computed
+    once per snapshot and stored. `deltas` is {horizon: {symbol: change}} for `date`.
+    """
+    date = date or datetime.now().strftime("%Y-%m-%d")
+    day = datetime.strptime(date, "%Y-%m-%d").date()
+    entity = get_entity_key(entity_config)
+    delta_columns = [f"change_{horizon}d" for horizon in WINDOW_HORIZONS]
+    symbol_filter = f"AND symbol IN ({', '.join(['%s'] * len(symbols))})" if symbols else ""
+
+    with transaction() as cursor:
+        # Drop days that fell out of the window
+        cursor.execute(f"""
+            DELETE FROM {WINDOW_TABLE}
+            WHERE entity = %s AND date < %s - INTERVAL %s DAY
+        """, (entity, date, WINDOW_DAYS))
+
+        # Copy earlier days only when the window lacks some; a daily run finds none missing
+        cursor.execute(f"""
+            SELECT DISTINCT date FROM {WINDOW_TABLE}
+            WHERE entity = %s AND date >= %s - INTERVAL %s DAY AND date < %s
+        """, (entity, date, WINDOW_DAYS, date))
+        window_dates = {row['date'] for row in cursor.fetchall()}
+        if len(window_dates) < WINDOW_DAYS:
+            cursor.execute(f"""
+                SELECT DISTINCT date FROM {HOLDINGS_TABLE}
+                WHERE entity = %s AND date >= %s - INTERVAL %s DAY AND date < %s
+            """, (entity, date, WINDOW_DAYS, date))
+            missing_dates = [row['date'] for row in cursor.fetchall() if row['date'] not in window_dates]
+            if missing_dates:
+                cursor.execute(f"""
+                    INSERT IGNORE INTO {WINDOW_TABLE} (entity, date, symbol, amount)
+                    SELECT entity, date, symbol, amount FROM {HOLDINGS_TABLE}
+                    WHERE entity = %s AND date IN ({', '.join(['%s'] * len(missing_dates))})
+                """, (entity, *missing_dates))
+
+        # Take the day's snapshot as saved; a changed amount clears its stale deltas and their flag
+        cursor.execute(f"""
+            INSERT INTO {WINDOW_TABLE} (entity, date, symbol, amount)
+            SELECT entity, date, symbol, amount FROM {HOLDINGS_TABLE}
+            WHERE entity = %s AND date = %s
+            ON DUPLICATE KEY UPDATE
+                {', '.join(
+                    f"{column} = IF({WINDOW_TABLE}.amount <=> VALUES(amount), {WINDOW_TABLE}.{column}, NULL)"
+                    for column in delta_columns
+                )},
+                deltas_computed = {WINDOW_TABLE}.deltas_computed AND {WINDOW_TABLE}.amount <=> VALUES(amount),
+                amount = VALUES(amount)
+        """, (entity, date))
+
+        cursor.execute(f"""
+            SELECT date, symbol, amount, {', '.join(delta_columns)}, deltas_computed FROM {WINDOW_TABLE}
+            WHERE entity = %s {symbol_filter}
+            ORDER BY date DESC
+        """, (entity, *(symbols or [])))
+        rows = cursor.fetchall()
+
+        deltas = stored_window_deltas(rows, day)
+        if deltas is None:
+            deltas = get_window_deltas(rows, day, symbols)
+            amounts = {row['symbol']: row['amount'] for row in rows if row['date'] == day}
+            if deltas:
+                # Rewrite the day's rows with their deltas; an upsert keeps executemany batched
+                cursor.executemany(f"""
+                    INSERT INTO {WINDOW_TABLE} (entity, date, symbol, amount, {', '.join(delta_columns)}, deltas_computed)
+                    VALUES (%s, %s, %s, %s, {', '.join(['%s'] * len(delta_columns))}, TRUE)
+                    ON DUPLICATE KEY UPDATE
+                        {', '.join(f"{column} = VALUES({column})" for column in delta_columns)},
+                        deltas_computed = TRUE
+                """, [
+                    (entity, date, symbol, amounts[symbol], *(deltas[horizon][symbol] for horizon in WINDOW_HORIZONS))
+                    for symbol in deltas[WINDOW_HORIZONS[0]]
+                ])
+
+    return pivot_rows(rows, symbols), deltas
+
+def migrate_legacy_tables(drop=False):
+    """Move data from the wide `{table}{N}` shards into the long-format holdings table."""
+    initialize_database()
+
+    with get_connection() as connection:
+        try:
+            with connection.cursor() as cursor:
+                for category, entities in ENTITIES.items():
+                    for entity_name, entity_config in entities.items():
+                        entity = get_entity_key(entity_config)
+                        legacy_tables, _ = get_table_info(cursor, entity_config)
+
+                        if entity_config['table'] in get_table_catalog(cursor):
+                            legacy_tables.insert(0, entity_config['table'])
+
+                        if not legacy_tables:
+                            print(f"No legacy tables for {entity_config['title']}")
+                            continue
+
+                        for table_name in legacy_tables:
+                            cursor.execute(f"SELECT * FROM {table_name}")
+                            rows = [
+                                (entity, row['date'], symbol, amount)
+                                for row in cursor.fetchall()
+                                for symbol, amount in row.items()
+                                if symbol != 'date' and amount is not None
+                            ]
+
+                            for i in range(0, len(rows), MIGRATION_BATCH_SIZE):
+                                cursor.executemany(UPSERT_HOLDINGS, rows[i:i + MIGRATION_BATCH_SIZE])
+                            connection.commit()
+                            print(f"Migrated {len(rows)} rows from {table_name}")
+
+                        if drop:
+                            for table_name in legacy_tables:
+                                cursor.execute(f"DROP TABLE {table_name}")
+                                print(f"Dropped {table_name}")
+                            connection.commit()
+                            invalidate_table_catalog()
+        except Exception as e:
+            print(f"Migration Error: {e}")
+            connection.rollback()
+
+# **📌 Historical Backfill**
+def read_backfill_csv(path):
+    """Long CSV (entity?, date, symbol, amount) or wide CSV (date, <symbol>...); entity defaults to the file name."""
+    with open(path, newline="", encoding="utf-8") as file:
+        reader = csv.DictReader(file)
+        long_format = "symbol" in (reader.fieldnames or [])
+        for record in reader:
+            entity = record.get("entity") or path.stem
+            if long_format:
+                if record.get("amount") not in (None, ""):
+                    yield entity, record["date"], record["symbol"], record["amount"]
+                continue
+            for symbol, amount in record.items():
+                if symbol not in ("entity", "date") and amount not in (None, ""):
+                    yield entity, record["date"], symbol, amount
+
+def read_backfill_json(path):
+    """A list of {entity?, date, symbol, amount} or {entity?, date, holdings: {symbol: amount}} records,
+    or one captured Arkham payload saved as <entity>/<date>.json."""
+    with open(path, encoding="utf-8") as file:
+        payload = json.load(file)
+
+    if isinstance(payload, dict):
+        for symbol, amount in (parse_holdings_json(payload) or {}).items():
+            yield path.parent.name, path.stem, symbol, amount
+        return
+
+    for record in payload:
+        entity = record.get("entity") or path.stem
+        if "holdings" in record:
+            for symbol, amount in record["holdings"].items():
+                yield entity, record["date"], symbol, amount
+        elif record.get("amount") is not None:
+            yield entity, record["date"], record["symbol"], record["amount"]
+
+def read_backfill_html(path):
+    """A saved entity page as <entity>/<date>.html."""
+    html_content = path.read_text(encoding="utf-8", errors="ignore")
+    for symbol, amount in (extract_holdings_and_value(html_content) or {}).items():
+        yield path.parent.name, path.stem, symbol, amount
+
+BACKFILL_READERS = {".csv": read_backfill_csv, ".json": read_backfill_json, ".html": read_backfill_html}
+
+def read_backfill_archive(date):
+    """Every Arkham page and holdings payload archived on `date` (YYYY-MM-DD)."""
+    entities = {
+        entity_config['url']: get_entity_key(entity_config)
+        for entities in ENTITIES.values()
+        for entity_config in entities.values()
+    }
+    # Network payloads come last so they win over a DOM page of the same day
+    for site, url, content in [*iter_archive(date, "arkham"), *iter_archive(date, "arkham_network")]:
+        entity = entities.get(url.removesuffix("#balances"))
+        if not entity:
+            print(f"Skipping archived page of unknown entity: {url}")
+            continue
+        if site == "arkham_network":
+            holdings_data = parse_holdings_json(json.loads(content))
+        else:
+            holdings_data = extract_holdings_and_value(content)
+        for symbol, amount in (holdings_data or {}).items():
+            yield entity, date, symbol, amount
+
+def iter_backfill_rows(paths):
+    """(entity, date, symbol, amount) rows from every export file under the given paths."""
+    for path in map(Path, paths):
+        files = sorted(path.rglob("*")) if path.is_dir() else [path]
+        for file_path in files:
+            reader = BACKFILL_READERS.get(file_path.suffix.lower())
+            if not reader:
+                continue
+            try:
+                yield from reader(file_path)
+            except Exception as e:
+                print(f"Skipping {file_path}: {e}")
+
+def iter_archive_rows(dates):
+    """(entity, date, symbol, amount) rows from the page archive of every given day."""
+    for date in dates:
+        try:
+            yield from read_backfill_archive(date)
+        except Exception as e:
+            print(f"Skipping archive of {date}: {e}")
+
+def backfill_holdings(paths=(), archive_dates=(), chunk_size=MIGRATION_BATCH_SIZE):
+    """Bulk-load past snapshots from export files and archived pages, one transaction per chunk of rows."""
+    initialize_database()
+
+    start = time.perf_counter()
+    total = 0
+    skipped = 0
+    chunk = []
+
+    def write_chunk():
+        nonlocal total
+        with transaction() as cursor:
+            cursor.executemany(UPSERT_HOLDINGS, chunk)
+        total += len(chunk)
+        elapsed = time.perf_counter() - start
+        print(f"Loaded {total:,} rows ({total / elapsed:,.0f} rows/s)")
+        chunk.clear()
+
     try:
-        with connection.cursor() as cursor:
-            all_data = []
-            existing_tables = []
-            
-            # First check base table
+        for entity, date, symbol, amount in chain(iter_backfill_rows(paths), iter_archive_rows(archive_dates)):
+            # Cells that don't parse are skipped rather than stored as zero holdings
             try:
-                cursor.execute(f"SHOW TABLES LIKE '{entity_config['table']}'")
-                if cursor.fetchone():
-                    existing_tables.append(entity_config['table'])
-            except Exception:
-                pass
-                
-            # Then check numbered tables
-            table_num = 1
-            while True:
-                table_name = f"{entity_config['table']}{table_num}"
-                try:
-                    cursor.execute(f"SHOW TABLES LIKE '{table_name}'")
-                    if cursor.fetchone():
-                        existing_tables.append(table_name)
-                        table_num += 1
-                    else:
-                        break
-                except Exception:
-                    break
-            
-            if not existing_tables:
-                return []
-            
-            # Load and merge data from all tables
-            for i, table_name in enumerate(existing_tables):
-                cursor.execute(f"SELECT * FROM {table_name} ORDER BY date DESC")
-                table_data = cursor.fetchall()
-                
-                if i == 0:
-                    all_data = table_data  # First table data becomes base
-                else:
-                    # Merge additional table data
-                    for j, row in enumerate(all_data):
-                        if j < len(table_data):
-                            all_data[j].update({k: v for k, v in table_data[j].items() 
-                                              if k not in ['date']})
-            
-            return all_data
-    finally:
-        connection.close()
+                amount = parse_amount(amount) if isinstance(amount, str) else float(amount)
+            except (ValueError, TypeError):
+                skipped += 1
+                continue
+            if not fits_holdings_columns(str(symbol), amount):
+                skipped += 1
+                continue
+            chunk.append((entity, str(date)[:10], symbol, amount))
+            if len(chunk) >= chunk_size:
+                write_chunk()
+        if chunk:
+            write_chunk()
+    except Exception as e:
+        print(f"Backfill Error: {e}")
+
+    elapsed = time.perf_counter() - start
+    print(f"Backfill finished: {total:,} rows in {elapsed:.1f}s ({total / elapsed if elapsed else 0:,.0f} rows/s)")
+    if skipped:
+        print(f"Skipped {skipped:,} rows with unreadable or out-of-range amounts")
+    return total
 
 # **📌 Calculate Changes**
 def format_number(value):
@@ -523,201 +722,100 @@ def format_number(value):
     
     return f"{float(str_value):,}"
 
-def convert_to_float(value):
-    """Convert string values with 'K', 'M', or 'B' into float numbers."""
-    if isinstance(value, str):
-        value = value.replace(",", "").strip()
-
-        if value.endswith("B"):  # Billions
-            return float(value.replace("B", "")) * 1_000_000_000
-        elif value.endswith("M"):  # Millions
-            return float(value.replace("M", "")) * 1_000_000
-        elif value.endswith("K"):  # Thousands
-            return float(value.replace("K", "")) * 1_000
-        try:
-            return float(value)
-        except ValueError:
-            return 0
+def format_amount(value):
+    """Holding change as shown in insights: 2 decimals below 1, whole units with commas above."""
+    return f"{value:.2f}" if abs(value) < 1 else format(int(value), ',')
 
-    return value
+def format_change(changes, index, sign="", horizons=None):
+    """One insight line: amount, % change, the streak if it adds information and longer horizons."""
+    symbol = changes.symbols[index]
+    abs_change = changes.change[index]
+    pct_change = changes.pct_change[index]
+    formatted_change = format_amount(abs_change)
 
-def calculate_changes(new_data, old_data):
-    """Calculate daily and monthly asset quantity change, ensuring numeric values."""
-    daily_changes = {}
-    monthly_changes = {}
+    streak_info = ""
+    streak_count = int(changes.streak_length[index])
+    total_change = changes.streak_change[index]
+    if streak_count > 1 and abs(total_change - pct_change) > 0.01:
+        streak_info = f" | {streak_count}d (*{total_change:+.2f}%*)"
 
-    for new in new_data:
-        asset_symbol = new["asset_symbol"]
-        new_amount = convert_to_float(new["amount"])
-        
-        # ✅ Get the previous day's entry
-        old_entry = next((item for item in old_data if item["asset_symbol"] == asset_symbol), None)
-        old_amount = convert_to_float(old_entry["amount"]) if old_entry else 0
-
-        # ✅ Calculate daily change
-        daily_changes[asset_symbol] = new_amount - old_amount if old_entry else "No Data"
-
-        # ✅ Calculate monthly change
-        total_change = "Shown after 1 month"
-        for i in range(1, 31):  # Last 30 days
-            past_entry = next((item for item in old_data 
-                             if item["asset_symbol"] == asset_symbol 
-                             and item["date"] == (datetime.now() - timedelta(days=i)).strftime("%Y-%m-%d")), None)
-            if past_entry:
-                total_change = new_amount - convert_to_float(past_entry["amount"])
-                break
-
-        monthly_changes[asset_symbol] = total_change
-
-    return daily_changes, monthly_changes
-
- 
-def get_max_changes(df, columns):
-    """Find maximum absolute value changes with streak information."""
+    # Weekly and monthly net change, when the history reaches that far back
+    horizon_info = "".join(
+        f" | {horizon}d {'+' if change[index] > 0 else ''}{format_amount(change[index])}"
+        for horizon, change in (horizons or {}).items()
+        if not np.isnan(change[index])
+    )
+
+    return f"{symbol} {sign}{formatted_change} (*{pct_change:+.2f}%*){streak_info}{horizon_info}"
+
+def get_max_changes(df, columns, deltas=None):
+    """Find maximum absolute value changes with streak information.
+
+    `deltas` are the window's stored {horizon: {symbol: change}}; without them the longer
+    horizons are computed from `df`.
+    """
     if len(df) < 2:  # Need at least today and yesterday
         return [], []
-        
-    try:
-        # Initialize Binance client
-        binance = ccxt.binance()
-        
-        # Get current prices for all symbols
-        prices = {}
-        for symbol in columns:
-            if symbol not in TOP_MARKET_SYMBOLS:
-                continue
-            try:
-                ticker = binance.fetch_ticker(f'{symbol}/USDT')
-                prices[symbol] = ticker['last']
-            except Exception as e:
-                print(f"Could not get price for {symbol}: {e}")
-                continue
-    except Exception as e:
-        print(f"Error initializing Binance client: {e}")
-        return [], []
-        
+
+    tracked = [column for column in columns if TRACKED_SYMBOLS is None or column in TRACKED_SYMBOLS]
+
+    # Current prices come from one cached bulk ticker fetch shared by all entities
+    prices = get_prices(tracked)
+
+    # Every symbol's change and streak in one pass over the date x symbol matrix
+    symbols, matrix = holdings_matrix(df, [symbol for symbol in tracked if symbol in prices])
+    changes = compute_changes(symbols, matrix, prices)
+    if deltas:
+        horizons = {
+            horizon: np.array([
+                np.nan if deltas[horizon].get(symbol) is None else deltas[horizon][symbol]
+                for symbol in symbols
+            ])
+            for horizon in INSIGHT_HORIZONS
+        }
+    else:
+        horizons = horizon_changes(df['date'].to_numpy(), matrix, INSIGHT_HORIZONS)
+
     assets = []
     messages = []
-    max_increase_value = (None, -float('inf'))
-    max_decrease_value = (None, float('inf'))
-    
-    streaks = {}
-    changes = {}
-    all_changes = {}
-    
-    # Process all symbols first
-    for column in columns:
-        if column not in df.columns or column not in TOP_MARKET_SYMBOLS or column not in prices:
-            continue
-            
-        df[column] = df[column].astype(float)
-        today_value = df[column].iloc[-1]
-        yesterday_value = df[column].iloc[-2]
-        
-        if pd.isna(today_value) or pd.isna(yesterday_value):
-            continue
-            
-        # Calculate daily change
-        abs_change = today_value - yesterday_value
-        usd_value = abs_change * prices[column]
-        pct_change = 0 if yesterday_value == 0 else ((today_value - yesterday_value) / yesterday_value) * 100
-        
-        changes[column] = pct_change
-        all_changes[column] = (usd_value, abs_change, pct_change)
-        
-        # Track max changes based on USD value
-        if usd_value > 0 and usd_value > max_increase_value[1]:
-            max_increase_value = (column, usd_value, abs_change, pct_change)
-        if usd_value < 0 and usd_value < max_decrease_value[1]:
-            max_decrease_value = (column, usd_value, abs_change, pct_change)
-            
-        # Calculate streak
-        streak_count = 1
-        streak_start_value = yesterday_value
-        
-        for value in df[column].iloc[-3::-1]:
-            if pd.isna(value):
-                break
-            change = 0 if value == 0 else (df[column].iloc[-1] - value) / value * 100
-            if (pct_change > 0 and change > 0) or (pct_change < 0 and change < 0):
-                streak_count += 1
-                streak_start_value = value
-            else:
-                break
-                
-        if streak_count > 1:
-            total_streak_change = ((today_value - streak_start_value) / streak_start_value) * 100
-            streaks[column] = (streak_count, total_streak_change)
-    
     processed_symbols = set()
-    
-    # Add max increase if it exists
-    if max_increase_value[0]:
-        symbol, _, abs_change, pct_change = max_increase_value
-        assets.append(symbol)
-        processed_symbols.add(symbol)
-        formatted_change = f"{abs_change:.2f}" if abs(abs_change) < 1 else format(int(abs_change), ',')
-        
-        streak_info = ""
-        if symbol in streaks:
-            streak_count, total_change = streaks[symbol]
-            if abs(total_change - pct_change) > 0.01:
-                streak_info = f" | {streak_count}d (*{total_change:+.2f}%*)"
-            
-        messages.append(
-            f"{symbol} +{formatted_change} (*{pct_change:+.2f}%*){streak_info}"
-        )
-    
-    # Add max decrease if it exists
-    if max_decrease_value[0]:
-        symbol, _, abs_change, pct_change = max_decrease_value
-        assets.append(symbol)
-        processed_symbols.add(symbol)
-        formatted_change = f"{abs_change:.2f}" if abs(abs_change) < 1 else format(int(abs_change), ',')
-        
-        streak_info = ""
-        if symbol in streaks:
-            streak_count, total_change = streaks[symbol]
-            if abs(total_change - pct_change) > 0.01:
-                streak_info = f" | {streak_count}d (*{total_change:+.2f}%*)"
-            
-        messages.append(
-            f"{symbol} {formatted_change} (*{pct_change:+.2f}%*){streak_info}"
-        )
-    
+
+    # Add max increase and max decrease if they exist
+    increase, decrease = top_movers(changes)
+    for index, sign in ((increase, "+"), (decrease, "")):
+        if index is None:
+            continue
+        assets.append(symbols[index])
+        processed_symbols.add(symbols[index])
+        messages.append(format_change(changes, index, sign, horizons))
+
     # Handle MUST_SYMBOLS
     must_symbols_with_changes = []
     must_symbols_no_changes = []
-    
+
     for symbol in MUST_SYMBOLS:
-        if symbol in all_changes and symbol not in processed_symbols:
-            usd_value, abs_change, pct_change = all_changes[symbol]
-            assets.append(symbol)
-            
-            # Consider very small changes (less than 0.01%) as no change
-            if abs(pct_change) < 0.01:
-                must_symbols_no_changes.append(symbol)
-            else:
-                formatted_change = f"{abs_change:.2f}" if abs(abs_change) < 1 else format(int(abs_change), ',')
-                streak_info = ""
-                if symbol in streaks:
-                    streak_count, total_change = streaks[symbol]
-                    if abs(total_change - pct_change) > 0.01:
-                        streak_info = f" | {streak_count}d (*{total_change:+.2f}%*)"
-                
-                sign = "+" if usd_value > 0 else ""
-                must_symbols_with_changes.append(
-                    f"{symbol} {sign}{formatted_change} (*{pct_change:+.2f}%*){streak_info}"
-                )
-    
+        if symbol not in symbols or symbol in processed_symbols:
+            continue
+        index = symbols.index(symbol)
+        if not changes.valid[index]:
+            continue
+        assets.append(symbol)
+
+        # Consider very small changes (less than 0.01%) as no change
+        if abs(changes.pct_change[index]) < 0.01:
+            must_symbols_no_changes.append(symbol)
+        else:
+            sign = "+" if changes.usd_change[index] > 0 else ""
+            must_symbols_with_changes.append(format_change(changes, index, sign, horizons))
+
     # Add messages for MUST_SYMBOLS
     messages.extend(must_symbols_with_changes)
     if must_symbols_no_changes:
         messages.append(f"{', '.join(must_symbols_no_changes)} (hold)")
-    
+
     return list(set(assets)), messages
 
-def get_insight(df, display_columns=None):
+def get_insight(df, display_columns=None, deltas=None):
     """Generate insights from the data."""
     insights = []
     display_assets = set()
@@ -727,7 +825,7 @@ def get_insight(df, display_columns=None):
         display_columns = [col for col in df.columns if col != 'date']
     
     # Get all insights but keep them separate
-    change_assets, change_msgs = get_max_changes(df, display_columns)
+    change_assets, change_msgs = get_max_changes(df, display_columns, deltas)
     # Add messages in specific order:
     # 1. Changes (increases/decreases)
 
@@ -745,23 +843,8 @@ def check_column_overlaps(cursor, entity_config):
     """Debug function to check for any column overlaps between tables."""
     print(f"\nChecking for column overlaps in {entity_config['title']} tables...")
     
-    # Get all tables for this entity
-    table_num = 1
-    tables = []
-    columns_by_table = {}
-    
-    while True:
-        table_name = f"{entity_config['table']}{table_num}"
-        try:
-            cursor.execute(f"SHOW COLUMNS FROM {table_name}")
-            columns = {row['Field'] for row in cursor.fetchall()}
-            if 'date' in columns:
-                columns.remove('date')
-            tables.append(table_name)
-            columns_by_table[table_name] = columns
-            table_num += 1
-        except Exception:
-            break
+    # Get all tables for this entity from the cached catalog
+    tables, columns_by_table = get_table_info(cursor, entity_config)
     
     if not tables:
         print("No tables found")
@@ -798,77 +881,55 @@ def check_column_overlaps(cursor, entity_config):
     return not overlaps_found
 
 # **📌 Main Execution**
-def get_entity_data(entity_config):
-    """Main function to fetch and process entity data."""
-    print(f"\n=== Starting {entity_config['title']} Data Collection ===")
+def get_entity_data(entity_config, holdings_data=None):
+    """Save freshly fetched holdings (if given) and return the entity's rolling window and its deltas."""
+    print(f"\n=== Processing {entity_config['title']} Data ===")
+
+    if PAGE_REPLAY:
+        # Read-only: the replayed snapshot on top of the stored days before it
+        date = snapshot_date()
+        history = load_data_from_mysql(entity_config, TRACKED_SYMBOLS, HISTORY_DAYS, before=date)
+        if holdings_data:
+            snapshot = {
+                symbol: amount for symbol, amount in holdings_data.items()
+                if TRACKED_SYMBOLS is None or symbol in TRACKED_SYMBOLS
+            }
+            history.insert(0, {'date': datetime.strptime(date, "%Y-%m-%d").date(), **snapshot})
+        return history, None
     
-    connection = connect_to_database()
-    if not connection:
-        return None
-        
     try:
-        with connection.cursor() as cursor:
-            today_date = datetime.now().strftime("%Y-%m-%d")
-            
-            # Get table info once
-            existing_tables, table_columns = get_table_info(cursor, entity_config)
-            
-            if not existing_tables:
-                print("No tables found, will create new ones")
-                html_content = fetch_data_with_firefox(entity_config['url'])
-                if not html_content:
-                    return None
-                result = create_tables_if_not_exist(entity_config, html_content)
-                if not result:
-                    return None
-                html_content, existing_tables, table_columns = result
-                
-                # Process and save new data
-                holdings_data = extract_holdings_and_value(html_content)
-                if not holdings_data:
-                    print("Unable to extract holdings data")
-                    return None
-                
-                save_data_to_mysql(entity_config, holdings_data, 
-                                 existing_tables, table_columns)
-            else:
-                # Check if today's data exists in any table
-                has_today_data = False
-                for table_name in existing_tables:
-                    cursor.execute(f"""
-                        SELECT COUNT(*) as count 
-                        FROM {table_name} 
-                        WHERE date = %s
-                    """, (today_date,))
-                    result = cursor.fetchone()
-                    if result and result['count'] > 0:
-                        has_today_data = True
-                        print(f"Found today's data in {table_name}")
-                        break
-                
-                if not has_today_data:
-                    print("No data for today, fetching new data")
-                    html_content = fetch_data_with_firefox(entity_config['url'])
-                    if not html_content:
-                        return None
-                    
-                    holdings_data = extract_holdings_and_value(html_content)
-                    if not holdings_data:
-                        print("Unable to extract holdings data")
-                        return None
-                    
-                    save_data_to_mysql(entity_config, holdings_data, 
-                                     existing_tables, table_columns)
-                else:
-                    print("Today's data already exists")
-            
-            return load_data_from_mysql(entity_config)
-            
+        if holdings_data:
+            save_data_to_mysql(entity_config, holdings_data)
+        else:
+            print("Today's data already exists")
     except Exception as e:
         print(f"Error in get_entity_data: {e}")
+        return None, None
+
+    try:
+        # Each run only updates the entity's rolling window, however long the history grows
+        return refresh_holdings_window(entity_config, TRACKED_SYMBOLS)
+    except Exception as e:
+        print(f"Holdings window error, reading history instead: {e}")
+        return load_data_from_mysql(entity_config, TRACKED_SYMBOLS, HISTORY_DAYS), None
+
+def get_entity_insights(entity_config, entity_data, deltas=None):
+    """Turn an entity's history rows (and the window's stored deltas, if any) into insight messages."""
+    if not entity_data:
+        print(f"No data available for {entity_config['title']}")
+        return None
+
+    try:
+        df = pd.DataFrame(list(entity_data))
+        if df.empty:
+            return None
+        df['date'] = pd.to_datetime(df['date'])
+        df = df.sort_values('date', ascending=True)
+        insights, _ = get_insight(df, deltas=deltas)
+        return insights
+    except Exception as e:
+        print(f"Error processing data for {entity_config['title']}: {e}")
         return None
-    finally:
-        connection.close()
 
 
 def format_insights_message(insights):
@@ -905,42 +966,44 @@ def get_entities():
     all_insights = {}
     
     try:
-        connection = connect_to_database()
-        if not connection:
-            return "Error connecting to database"
-            
-        try:
-            with connection.cursor() as cursor:
-                # First check for any overlaps
-                for category, entities in ENTITIES.items():
-                    for entity_name, entity_config in entities.items():
-                        check_column_overlaps(cursor, entity_config)
-        finally:
-            connection.close()
-        
-        # Process all entities
-        for category, entities in ENTITIES.items():
-            category_insights = {}
-            for entity_name, entity_config in entities.items():
-                print(f"\nProcessing {entity_config['title']}...")
-                
-                entity_data = get_entity_data(entity_config)
-                if entity_data and len(entity_data) > 0:
-                    try:
-                        df = pd.DataFrame(list(entity_data))
-                        if not df.empty:
-                            df['date'] = pd.to_datetime(df['date'])
-                            df = df.sort_values('date', ascending=True)
-                            insights, _ = get_insight(df)
-                            if insights:
-                                category_insights[entity_name] = insights
-                    except Exception as e:
-                        print(f"Error processing data for {entity_config['title']}: {e}")
-                else:
-                    print(f"No data available for {entity_config['title']}")
-            
-            if category_insights:
-                all_insights[category] = category_insights
+        initialize_database()
+        today_date = datetime.now().strftime("%Y-%m-%d")
+        up_to_date = []
+        pending = {}  # url -> (category, entity_name, entity_config)
+
+        with get_connection() as connection, connection.cursor() as cursor:
+            # First check for any overlaps in legacy tables
+            for category, entities in ENTITIES.items():
+                for entity_name, entity_config in entities.items():
+                    check_column_overlaps(cursor, entity_config)
+
+            # Only entities without today's snapshot need a browser; a replay reads every archived page
+            for category, entities in ENTITIES.items():
+                for entity_name, entity_config in entities.items():
+                    if not PAGE_REPLAY and has_data_for_date(cursor, entity_config, today_date):
+                        up_to_date.append((category, entity_name, entity_config))
+                    else:
+                        pending[entity_config['url']] = (category, entity_name, entity_config)
+
+        def process_entity(category, entity_name, entity_config, holdings_data=None):
+            entity_data, deltas = get_entity_data(entity_config, holdings_data)
+            insights = get_entity_insights(entity_config, entity_data, deltas)
+            if insights:
+                all_insights.setdefault(category, {})[entity_name] = insights
+
+        # Pages load on the pool while up-to-date entities are processed
+        print(f"Fetching {len(pending)} entity pages with up to {BROWSER_POOL_SIZE} browsers")
+        pages = fetch_pages(pending, fetch_entity_holdings)
+
+        for category, entity_name, entity_config in up_to_date:
+            process_entity(category, entity_name, entity_config)
+
+        for url, holdings_data in pages:
+            category, entity_name, entity_config = pending[url]
+            if not holdings_data:
+                print(f"Unable to fetch holdings data for {entity_config['title']}")
+                continue
+            process_entity(category, entity_name, entity_config, holdings_data)
         
         return all_insights if all_insights else None
         
@@ -949,32 +1012,8 @@ def get_entities():
         return None
 
 def get_whales():
-    """Main function to run whale tracker with Docker lifecycle management."""
+    """Main function to run whale tracker on the shared browser service."""
     try:
-        # Start Docker container
-        client = docker.from_env()
-        container_name = "selenium-firefox"
-        
-        # Clean up any existing container
-        try:
-            container = client.containers.get(container_name)
-            print(f"Found existing container {container_name}, removing it...")
-            container.stop()
-            container.remove()
-        except docker.errors.NotFound:
-            print(f"No existing container {container_name} found")
-
-        # Start new container
-        print(f"Starting new {container_name} container...")
-        client.containers.run(
-            "selenium/standalone-firefox",
-            name=container_name,
-            ports={"4444/tcp": 4444},
-            detach=True,
-        )
-        print("Docker container started")
-        time.sleep(3)  # Give container time to fully start
-        
         # Get insights from both sources
         entity_insights = get_entities()
         
@@ -989,19 +1028,24 @@ def get_whales():
         print(f"\nError in main process: {e}")
         return f"Error processing entities: {str(e)}"
     finally:
-        # Clean up Docker container
-        try:
-            container = client.containers.get(container_name)
-            print(f"\nStopping and removing {container_name} container...")
-            container.stop()
-            container.remove()
-            print("Container cleanup completed")
-        except docker.errors.NotFound:
-            print(f"Container {container_name} already removed")
-        except Exception as e:
-            print(f"Error cleaning up container: {e}")
+        # Hand the sessions back so the browser service can idle out
+        close_sessions("firefox")
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "migrate":
+        # python get_whales.py migrate [--drop]
+        migrate_legacy_tables(drop="--drop" in sys.argv)
+        sys.exit(0)
+
+    if len(sys.argv) > 2 and sys.argv[1] == "backfill":
+        # python get_whales.py backfill <file or directory>...
+        # python get_whales.py backfill --archive <YYYY-MM-DD>...
+        if sys.argv[2] == "--archive":
+            backfill_holdings(archive_dates=sys.argv[3:])
+        else:
+            backfill_holdings(sys.argv[2:])
+        sys.exit(0)
+
     msg = get_whales()
     if msg:
         print("\nFinal message:")
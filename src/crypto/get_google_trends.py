@@ -3,6 +3,11 @@ from pytrends.exceptions import TooManyRequestsError
 from datetime import datetime, timedelta
 import random
 import time
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+from utils.streaks import sign_runs, reversals
+from utils.anomalies import rolling_anomalies
 
 CRYPTO_LIST = ['Bitcoin', 'Ethereum', 'XRP', 'Solana', 'Binance']
 
@@ -67,35 +72,21 @@ def get_max(normalized_trends):
 
 
 def get_reversal(normalized_trends):
-    df = normalized_trends.diff().iloc[1:].iloc[::-1].iloc[1:]  # Reverse for recent-first order and drop today
+    runs = sign_runs(normalized_trends.diff().iloc[1:])
+    reversed_yesterday = reversals(runs).iloc[-2]  # Yesterday, not today
     rising_streaks = {}
     falling_streaks = {}
 
-    for crypto in df.columns:
-        category_data = df[crypto]
-
-        # Determine yesterday's and the day before yesterday's direction
-        yesterday_change = category_data.iloc[0]
-        day_before_yesterday_change = category_data.iloc[1]
-
-        yesterday_direction = "rising" if yesterday_change > 0 else "falling" if yesterday_change < 0 else None
-        day_before_yesterday_direction = "rising" if day_before_yesterday_change > 0 else "falling" if day_before_yesterday_change < 0 else None
-
-        # Check if there was a reversal yesterday
-        if yesterday_direction and day_before_yesterday_direction and yesterday_direction != day_before_yesterday_direction:
-            # Start counting the streak for the previous direction
-            streak_count = 1
-            for change in category_data.iloc[2:]:
-                direction = "rising" if change > 0 else "falling" if change < 0 else None
-                if direction == day_before_yesterday_direction:
-                    streak_count += 1
-                else:
-                    break  # Stop counting when direction changes
-            
-            if yesterday_direction == "rising":
-                rising_streaks[crypto] = streak_count
-            else:
-                falling_streaks[crypto] = streak_count
+    for crypto in normalized_trends.columns:
+        if not reversed_yesterday[crypto]:
+            continue
+
+        # Length of the run that yesterday's change broke
+        streak_count = runs.previous_length[crypto].iloc[-2]
+        if runs.sign[crypto].iloc[-2] > 0:
+            rising_streaks[crypto] = streak_count
+        else:
+            falling_streaks[crypto] = streak_count
 
     # Find the longest streaks
     max_rising_streak = max(rising_streaks.values(), default=0)
@@ -123,33 +114,21 @@ def get_sudden_change(normalized_trends, window_size=30, std_multiplier=1):
     # Calculate percentage changes
     df = normalized_trends.pct_change() * 100
     df = df.iloc[1:]  # Drop NaN row caused by pct_change
-    yesterday = df.iloc[-2]  # Use yesterday's changes for comparison
-    df = df.iloc[-(window_size + 2):-2]  # Focus on the rolling window
+    # Full anomaly series; yesterday's row is compared with the rolling window before it
+    anomalies = rolling_anomalies(df, window_size, std_multiplier)
+    yesterday = df.iloc[-2]
     messages = []
 
     for crypto in df.columns:
-        category_data = df[crypto]
-        # Separate positive and negative changes
-        positive_changes = category_data[category_data > 0]
-        negative_changes = abs(category_data[category_data < 0])  # Absolute value for negative changes
-
-        # Calculate mean and threshold for positive changes
-        positive_mean = positive_changes.mean()
-        positive_std = positive_changes.std()
-        positive_threshold = positive_mean + (std_multiplier * positive_std)
-
-        # Calculate mean and threshold for negative changes
-        negative_mean = negative_changes.mean()
-        negative_std = negative_changes.std()
-        negative_threshold = negative_mean + (std_multiplier * negative_std)
-
-        # Check if yesterday's change exceeds the thresholds
+        flag = anomalies.flag[crypto].iloc[-2]
         value_yesterday = yesterday[crypto]
-        if value_yesterday > 0 and value_yesterday > positive_threshold:
+        if flag > 0:
+            positive_mean = anomalies.rise_mean[crypto].iloc[-2]
             messages.append(
                 f"{crypto} gained *{value_yesterday:.2f}%* in popularity, well above its monthly average of {positive_mean:.2f}%."
             )
-        elif value_yesterday < 0 and abs(value_yesterday) > negative_threshold:
+        elif flag < 0:
+            negative_mean = anomalies.fall_mean[crypto].iloc[-2]
             messages.append(
                 f"{crypto} declined *{abs(value_yesterday):.2f}%* in popularity, well above its monthly average of {negative_mean:.2f}%."
             )
@@ -2,7 +2,6 @@ import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 import requests
-from bs4 import BeautifulSoup
 import re
 import openai
 import asyncio
@@ -10,6 +9,7 @@ from datetime import datetime
 from dotenv import load_dotenv
 import os
 from utils import send_message
+from utils.extract import extract_binance_news
 
 # Load environment variables
 load_dotenv()
@@ -134,32 +134,20 @@ def fetch_ethereum_news():
         print(response.text)
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.text, 'html.parser')
-        news_containers = soup.find_all('div', class_='css-vurnku')
         today_news = []
         
-        for container in news_containers:
-            news_link = container.find('a', style='display:block;margin-bottom:8px')
-            if not news_link:
-                continue
-                
-            title_element = news_link.find('h3')
-            content_element = news_link.find('div', class_='css-10lrpzu')
+        for news in extract_binance_news(response.text):
+            date = extract_date_from_url(news.href)
             
-            if title_element and content_element:
-                href = news_link.get('href', '')
-                date = extract_date_from_url(href)
-                
-                # Only include news from today
-                if date and is_today(date):
-                    is_breaking = 'css-ifogq4' in title_element.get('class', [])
-                    news_item = {
-                        'title': title_element.text.strip(),
-                        'content': content_element.text.strip(),
-                        'date': date,
-                        'breaking': is_breaking
-                    }
-                    today_news.append(news_item)
+            # Only include news from today
+            if date and is_today(date):
+                news_item = {
+                    'title': news.title,
+                    'content': news.content,
+                    'date': date,
+                    'breaking': news.breaking
+                }
+                today_news.append(news_item)
         
         return today_news
 
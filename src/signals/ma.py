@@ -3,9 +3,9 @@ import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 import json
-import ccxt
 from dotenv import load_dotenv
 from utils import send_message
+from utils.prices import get_price
 import asyncio
 
 load_dotenv()
@@ -13,13 +13,11 @@ TRADE_CHAT_IDS = os.getenv("TRADE_CHAT_IDS", "").split(",")
 
 def get_binance_price(symbol):
     """Get real-time price from Binance."""
-    try:
-        exchange = ccxt.binance()
-        ticker = exchange.fetch_ticker(symbol)
-        return float(ticker['last'])
-    except Exception as e:
-        print(f"Error fetching price from Binance: {e}")
-        return None
+    base, quote = symbol.split("/")
+    price = get_price(base, quote)
+    if price is None:
+        print(f"Error fetching price from Binance: no ticker for {symbol}")
+    return price
 
 async def main():
     try:
@@ -0,0 +1,43 @@
+from typing import NamedTuple
+import numpy as np
+import pandas as pd
+
+
+class Anomalies(NamedTuple):
+    """Rolling thresholds and flags for every date and column of a change series."""
+    rise_mean: pd.DataFrame       # mean of the positive changes in the trailing window
+    rise_threshold: pd.DataFrame  # rise_mean + k x their std
+    fall_mean: pd.DataFrame       # mean size of the negative changes in the trailing window
+    fall_threshold: pd.DataFrame
+    flag: pd.DataFrame            # +1 unusual rise, -1 unusual fall, 0 otherwise
+
+
+def _side_stats(values, window_size, std_multiplier):
+    """Trailing mean and mean + k*std of the non-zero entries of `values` (zeros are excluded)."""
+    present = (values > 0).astype(float)
+    # Window of the `window_size` rows before each date, from running sums in O(n)
+    count = present.rolling(window_size, min_periods=1).sum().shift(1)
+    total = values.rolling(window_size, min_periods=1).sum().shift(1)
+    squares = (values ** 2).rolling(window_size, min_periods=1).sum().shift(1)
+
+    mean = total / count.where(count > 0)
+    variance = ((squares - total * mean) / (count - 1).where(count > 1)).clip(lower=0)
+    return mean, mean + std_multiplier * np.sqrt(variance)
+
+
+def rolling_anomalies(changes, window_size=30, std_multiplier=1):
+    """Flag changes that exceed the trailing window's mean + k*std for their own direction.
+
+    Rises are compared with the earlier rises and falls with the earlier falls (by size), over
+    the `window_size` rows before each date, for every date and column at once.
+    """
+    rises = changes.where(changes > 0, 0)
+    falls = (-changes).where(changes < 0, 0)
+
+    rise_mean, rise_threshold = _side_stats(rises, window_size, std_multiplier)
+    fall_mean, fall_threshold = _side_stats(falls, window_size, std_multiplier)
+
+    flag = pd.DataFrame(0, index=changes.index, columns=changes.columns)
+    flag[(changes > 0) & (changes > rise_threshold)] = 1
+    flag[(changes < 0) & (-changes > fall_threshold)] = -1
+    return Anomalies(rise_mean, rise_threshold, fall_mean, fall_threshold, flag)
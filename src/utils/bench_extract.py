@@ -0,0 +1,80 @@
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+from bs4 import BeautifulSoup
+from utils import extract
+from utils.page_archive import iter_archive
+
+# scraper -> (records from a soup, targeted extractor from raw html)
+BENCHMARKS = {
+    "arkham": (extract.arkham_holdings, extract.extract_arkham_holdings),
+    "quiverquant_listing": (extract.congress_listings, extract.extract_congress_listings),
+    "quiverquant_trader": (extract.congress_trades, extract.extract_congress_trade_table),
+    "wbtc": (extract.order_book, extract.extract_order_book),
+    "ccaf": (extract.mining_cost, extract.extract_mining_cost),
+    "binance_news": (extract.binance_news, extract.extract_binance_news),
+}
+
+
+def best_time(func, repeat):
+    """Best wall time of `repeat` calls, in milliseconds, plus the last result."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            result = func()
+        except Exception as e:
+            result = f"{type(e).__name__}: {e}"
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def benchmark_page(scraper, html, repeat):
+    records, extractor = BENCHMARKS[scraper]
+    # Baseline is what the scrapers used to do: build the whole document with html.parser
+    full_ms, full_result = best_time(lambda: records(BeautifulSoup(html, "html.parser")), repeat)
+    targeted_ms, targeted_result = best_time(lambda: extractor(html), repeat)
+    return full_ms, targeted_ms, full_result == targeted_result
+
+
+def iter_pages(pages_dir):
+    """Recorded pages laid out as <pages_dir>/<scraper>/*.html."""
+    for scraper in BENCHMARKS:
+        for page in sorted((pages_dir / scraper).glob("*.html")):
+            yield scraper, page.name, page.read_text(encoding="utf-8", errors="ignore")
+
+
+def iter_archived_pages(date=None):
+    """Pages from the day's page archive, for every scraper we can benchmark."""
+    for site, url, html in iter_archive(date):
+        if site in BENCHMARKS:
+            yield site, url.rstrip("/").rsplit("/", 1)[-1] or url, html
+
+
+def run(pages, repeat=5):
+    print(f"Parser backend: {extract.PARSER}")
+    print(f"{'Scraper':<22}{'Page':<28}{'KB':>8}{'Full ms':>10}{'Targeted ms':>13}{'Speedup':>9}  Match")
+    print("-" * 96)
+    for scraper, name, html in pages:
+        full_ms, targeted_ms, match = benchmark_page(scraper, html, repeat)
+        speedup = full_ms / targeted_ms if targeted_ms else float("inf")
+        print(
+            f"{scraper:<22}{name[:27]:<28}{len(html) / 1024:>8.0f}"
+            f"{full_ms:>10.1f}{targeted_ms:>13.1f}{speedup:>8.1f}x  {'ok' if match else 'MISMATCH'}"
+        )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python bench_extract.py <pages_dir> [repeat]")
+        print("       python bench_extract.py --archive [YYYY-MM-DD] [repeat]")
+        sys.exit(1)
+
+    if sys.argv[1] == "--archive":
+        args = sys.argv[2:]
+        date = args.pop(0) if args and "-" in args[0] else None
+        run(iter_archived_pages(date), int(args[0]) if args else 5)
+    else:
+        run(iter_pages(Path(sys.argv[1])), int(sys.argv[2]) if len(sys.argv) > 2 else 5)
@@ -0,0 +1,234 @@
+import atexit
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from selenium import webdriver
+from websocket import create_connection
+from dotenv import load_dotenv
+from utils import browser_service
+
+# Load environment variables
+load_dotenv()
+
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", 4))
+BROWSER_MAX_PAGES = int(os.getenv("BROWSER_MAX_PAGES", 25))  # Recycle a session after this many pages
+SESSION_CREATE_RETRIES = 3
+
+# Politeness per domain: max concurrent page loads and min seconds between load starts
+DOMAIN_LIMITS = {
+    "intel.arkm.com": {"concurrency": 3, "interval": 1.0},
+    "www.quiverquant.com": {"concurrency": 2, "interval": 2.0},
+}
+DEFAULT_DOMAIN_LIMIT = {"concurrency": 2, "interval": 1.0}
+
+_grid_counters = {}
+_grid_lock = threading.Lock()
+
+# Warm sessions waiting to be leased: browser -> [{"driver", "grid_url", "pages"}]
+_idle_sessions = {}
+_sessions_lock = threading.Lock()
+
+# WebDriver BiDi connection and installed preload scripts per session: session_id -> {"connection", "scripts"}
+_bidi = {}
+_bidi_lock = threading.Lock()
+
+_domain_semaphores = {}
+_domain_next_start = {}
+_domain_lock = threading.Lock()
+
+
+def next_grid_url(browser, grid_urls):
+    """Round-robin over the browser's Grid nodes."""
+    with _grid_lock:
+        count = _grid_counters.get(browser, 0)
+        _grid_counters[browser] = count + 1
+    return grid_urls[count % len(grid_urls)]
+
+
+def create_driver(browser, grid_url):
+    """Open a remote WebDriver session on a Grid node."""
+    if browser == "firefox":
+        options = webdriver.FirefoxOptions()
+        options.set_capability("webSocketUrl", True)  # WebDriver BiDi, for add_preload_script
+    else:
+        options = webdriver.ChromeOptions()
+        options.add_argument("--headless")
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-dev-shm-usage")
+
+    return webdriver.Remote(
+        command_executor=grid_url,
+        options=options
+    )
+
+
+def _open_session(browser):
+    # Every open session holds a lease, so the browser service stays up while it's in use
+    grid_url = next_grid_url(browser, browser_service.acquire(browser))
+    for attempt in range(SESSION_CREATE_RETRIES):
+        try:
+            return {"driver": create_driver(browser, grid_url), "browser": browser, "grid_url": grid_url, "pages": 0}
+        except Exception as e:
+            print(f"Error starting {browser} session on {grid_url} (attempt {attempt + 1}/{SESSION_CREATE_RETRIES}): {e}")
+            if attempt == SESSION_CREATE_RETRIES - 1:
+                browser_service.release(browser)
+                raise
+            time.sleep(2 ** attempt)
+
+
+def _quit_session(session):
+    with _bidi_lock:
+        bidi = _bidi.pop(session["driver"].session_id, None)
+    if bidi:
+        try:
+            bidi["connection"].close()
+        except Exception:
+            pass
+    try:
+        session["driver"].quit()
+    except Exception:
+        pass
+    browser_service.release(session["browser"])
+
+
+def _is_alive(session):
+    try:
+        session["driver"].window_handles
+        return True
+    except Exception:
+        return False
+
+
+@contextmanager
+def browser_session(browser="firefox"):
+    """Lease a warm WebDriver session, returned to the pool afterwards.
+
+    Sessions are recycled after BROWSER_MAX_PAGES leases or when the caller raises.
+    """
+    session = None
+    while session is None:
+        with _sessions_lock:
+            idle = _idle_sessions.get(browser)
+            session = idle.pop() if idle else None
+        if session is None:
+            session = _open_session(browser)
+        elif not _is_alive(session):
+            _quit_session(session)
+            session = None
+
+    healthy = False
+    try:
+        yield session["driver"]
+        healthy = True
+    finally:
+        session["pages"] += 1
+        if healthy and session["pages"] < BROWSER_MAX_PAGES:
+            with _sessions_lock:
+                _idle_sessions.setdefault(browser, []).append(session)
+        else:
+            _quit_session(session)
+
+
+def add_preload_script(driver, function_declaration):
+    """Run a JS function in every document the session loads, before the page's own scripts.
+
+    Installed once per session over WebDriver BiDi (script.addPreloadScript). Returns False
+    when the session has no BiDi endpoint or the browser refuses the script.
+    """
+    websocket_url = driver.capabilities.get("webSocketUrl")
+    if not isinstance(websocket_url, str):
+        return False
+
+    with _bidi_lock:
+        bidi = _bidi.get(driver.session_id)
+        if bidi and function_declaration in bidi["scripts"]:
+            return True
+        try:
+            if bidi is None:
+                bidi = {"connection": create_connection(websocket_url, timeout=10), "scripts": set(), "next_id": 1}
+                _bidi[driver.session_id] = bidi
+            command_id = bidi["next_id"]
+            bidi["next_id"] += 1
+            bidi["connection"].send(json.dumps({
+                "id": command_id,
+                "method": "script.addPreloadScript",
+                "params": {"functionDeclaration": function_declaration},
+            }))
+            while True:
+                message = json.loads(bidi["connection"].recv())
+                if message.get("id") == command_id:
+                    break
+        except Exception as e:
+            print(f"Could not install preload script: {e}")
+            return False
+
+        if message.get("type") != "success":
+            print(f"Preload script rejected: {message.get('message') or message.get('error')}")
+            return False
+        bidi["scripts"].add(function_declaration)
+        return True
+
+
+def close_sessions(browser=None):
+    """Quit idle sessions (all browsers by default), releasing their browser service leases."""
+    with _sessions_lock:
+        browsers = [browser] if browser else list(_idle_sessions)
+        sessions = [session for name in browsers for session in _idle_sessions.pop(name, [])]
+    for session in sessions:
+        _quit_session(session)
+
+
+atexit.register(close_sessions)
+
+
+@contextmanager
+def domain_slot(url):
+    """Hold one of the domain's concurrency slots, spacing out load starts."""
+    domain = urlparse(url).netloc
+    limit = DOMAIN_LIMITS.get(domain, DEFAULT_DOMAIN_LIMIT)
+
+    with _domain_lock:
+        semaphore = _domain_semaphores.setdefault(domain, threading.BoundedSemaphore(limit["concurrency"]))
+
+    with semaphore:
+        with _domain_lock:
+            now = time.monotonic()
+            start = max(now, _domain_next_start.get(domain, now))
+            _domain_next_start[domain] = start + limit["interval"]
+        if start > now:
+            time.sleep(start - now)
+        yield
+
+
+def _fetch_with_limits(fetch, url):
+    with domain_slot(url):
+        return fetch(url)
+
+
+def fetch_pages(urls, fetch, max_workers=BROWSER_POOL_SIZE):
+    """Start fetch(url) for every url on a bounded worker pool.
+
+    Returns an iterator of (url, result) in completion order, so callers can
+    process each page as soon as it arrives. Failed fetches yield None.
+    """
+    urls = list(urls)
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(urls) or 1)))
+    futures = {executor.submit(_fetch_with_limits, fetch, url): url for url in urls}
+
+    def results():
+        try:
+            for future in as_completed(futures):
+                url = futures[future]
+                try:
+                    yield url, future.result()
+                except Exception as e:
+                    print(f"Error fetching {url}: {e}")
+                    yield url, None
+        finally:
+            executor.shutdown(wait=True)
+
+    return results()
@@ -0,0 +1,180 @@
+import atexit
+import json
+import os
+import platform
+import threading
+import time
+from urllib.parse import urlparse
+from urllib.request import urlopen
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# "docker" runs one standalone Grid container per browser; "external" uses SELENIUM_GRID_URLS and never touches Docker
+BROWSER_SERVICE_MODE = os.getenv("BROWSER_SERVICE_MODE", "docker")
+EXTERNAL_GRID_URLS = [
+    url.strip()
+    for url in os.getenv("SELENIUM_GRID_URLS", "http://localhost:4444/wd/hub").split(",")
+    if url.strip()
+]
+
+# One container per browser, each on its own host port
+BROWSER_CONTAINERS = {
+    "firefox": {
+        "name": "selenium-firefox",
+        "image": "selenium/standalone-firefox",
+        "port": int(os.getenv("FIREFOX_GRID_PORT", 4444)),
+    },
+    "chrome": {
+        "name": "selenium-chromium",
+        "image": "selenium/standalone-chromium",
+        "port": int(os.getenv("CHROME_GRID_PORT", 4445)),
+    },
+}
+GRID_MAX_SESSIONS = int(os.getenv("BROWSER_POOL_SIZE", 4))
+GRID_READY_TIMEOUT = int(os.getenv("GRID_READY_TIMEOUT", 60))
+BROWSER_IDLE_TIMEOUT = float(os.getenv("BROWSER_IDLE_TIMEOUT", 300))  # Seconds without leases before a container stops
+
+# browser -> {"grid_urls", "leases", "container", "idle_timer"}
+_services = {}
+_services_lock = threading.Lock()
+_browser_locks = {}
+
+
+def get_docker_client():
+    import docker  # Only needed when we manage containers ourselves
+
+    system = platform.system()
+    if system == "Windows":
+        os.environ["DOCKER_HOST"] = "npipe:////./pipe/docker_engine"  # Docker Desktop
+    elif system == "Linux":
+        os.environ["DOCKER_HOST"] = "unix:///var/run/docker.sock"  # Native Docker Engine
+    # For Mac, Docker Desktop uses the default setup, no changes needed
+    return docker.from_env()
+
+
+def grid_ready(grid_url):
+    """Whether the Grid behind `grid_url` reports itself ready on /status."""
+    parsed = urlparse(grid_url)
+    try:
+        with urlopen(f"{parsed.scheme}://{parsed.netloc}/status", timeout=5) as response:
+            return bool(json.load(response).get("value", {}).get("ready"))
+    except Exception:
+        return False
+
+
+def wait_for_grid(grid_url, timeout=GRID_READY_TIMEOUT):
+    start = time.monotonic()
+    while not grid_ready(grid_url):
+        if time.monotonic() - start > timeout:
+            raise TimeoutError(f"Selenium Grid at {grid_url} not ready after {timeout}s")
+        time.sleep(0.5)
+    print(f"Selenium Grid at {grid_url} ready after {time.monotonic() - start:.1f}s")
+
+
+def _start_container(browser):
+    """Start (or adopt an already running) container for the browser and wait for its Grid."""
+    config = BROWSER_CONTAINERS[browser]
+    grid_url = f"http://localhost:{config['port']}/wd/hub"
+    client = get_docker_client()
+    from docker.errors import NotFound
+
+    try:
+        container = client.containers.get(config["name"])
+        if container.status == "running" and grid_ready(grid_url):
+            print(f"Reusing running {config['name']} container")
+            return container, grid_url
+        print(f"Found stale container {config['name']}, removing it...")
+        container.remove(force=True)
+    except NotFound:
+        pass
+
+    print(f"Starting {config['name']} container on port {config['port']}...")
+    container = client.containers.run(
+        config["image"],
+        name=config["name"],
+        ports={"4444/tcp": config["port"]},
+        environment={
+            "SE_NODE_MAX_SESSIONS": str(GRID_MAX_SESSIONS),
+            "SE_NODE_OVERRIDE_MAX_SESSIONS": "true",
+        },
+        detach=True,
+    )
+    wait_for_grid(grid_url)
+    return container, grid_url
+
+
+def _stop_container(browser, container):
+    try:
+        print(f"Stopping {BROWSER_CONTAINERS[browser]['name']} container...")
+        container.stop()
+        container.remove()
+    except Exception as e:
+        print(f"Error stopping {browser} container: {e}")
+
+
+def _browser_lock(browser):
+    with _services_lock:
+        return _browser_locks.setdefault(browser, threading.Lock())
+
+
+def acquire(browser):
+    """Lease the browser's Grid, starting it on first use. Returns its Grid URLs."""
+    with _browser_lock(browser):
+        service = _services.get(browser)
+        if service is None:
+            if BROWSER_SERVICE_MODE == "external":
+                service = {"grid_urls": EXTERNAL_GRID_URLS, "container": None}
+            else:
+                container, grid_url = _start_container(browser)
+                service = {"grid_urls": [grid_url], "container": container}
+            service.update(leases=0, idle_timer=None)
+            _services[browser] = service
+
+        if service["idle_timer"]:
+            service["idle_timer"].cancel()
+            service["idle_timer"] = None
+        service["leases"] += 1
+        return service["grid_urls"]
+
+
+def release(browser):
+    """Return a lease; the container stops after BROWSER_IDLE_TIMEOUT without any."""
+    with _browser_lock(browser):
+        service = _services.get(browser)
+        if service is None:
+            return
+        service["leases"] = max(0, service["leases"] - 1)
+        if service["leases"] == 0 and service["container"] is not None:
+            timer = threading.Timer(BROWSER_IDLE_TIMEOUT, _stop_if_idle, args=(browser,))
+            timer.daemon = True
+            service["idle_timer"] = timer
+            timer.start()
+
+
+def _stop_if_idle(browser):
+    with _browser_lock(browser):
+        service = _services.get(browser)
+        if service is None or service["leases"] > 0:
+            return
+        del _services[browser]
+    _stop_container(browser, service["container"])
+
+
+def shutdown():
+    """Stop every container this process manages, leased or not."""
+    with _services_lock:
+        browsers = list(_services)
+    for browser in browsers:
+        with _browser_lock(browser):
+            service = _services.pop(browser, None)
+        if service is None:
+            continue
+        if service["idle_timer"]:
+            service["idle_timer"].cancel()
+        if service["container"] is not None:
+            _stop_container(browser, service["container"])
+
+
+atexit.register(shutdown)
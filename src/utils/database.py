@@ -0,0 +1,155 @@
+import atexit
+import os
+import queue
+import threading
+from contextlib import contextmanager
+import pymysql
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# MySQL Connection Details from .env
+DB_HOST = os.getenv('DB_HOST')
+DB_USER = os.getenv('DB_USER')
+DB_PASSWORD = os.getenv('DB_PASSWORD')
+DB_NAME = os.getenv('DB_NAME')
+DB_PORT = int(os.getenv('DB_PORT', 3306))
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 4))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))
+
+# Idle connections, reused across modules for the whole process
+_pool = queue.LifoQueue()
+_pool_lock = threading.Lock()
+_open_connections = 0
+
+# Names of schemas already initialised in this process
+_initialized_schemas = set()
+_schema_lock = threading.Lock()
+
+
+def _connect():
+    try:
+        return pymysql.connect(
+            host=DB_HOST,
+            user=DB_USER,
+            password=DB_PASSWORD,
+            database=DB_NAME,
+            port=DB_PORT,
+            charset='utf8mb4',
+            cursorclass=pymysql.cursors.DictCursor
+        )
+    except Exception as e:
+        print(f"❌ MySQL Connection Error: {e}")
+        raise
+
+
+def _is_healthy(connection):
+    """Ping the server, reconnecting transparently if the link dropped."""
+    try:
+        connection.ping(reconnect=True)
+        return True
+    except Exception:
+        return False
+
+
+def _acquire():
+    global _open_connections
+
+    try:
+        connection = _pool.get_nowait()
+    except queue.Empty:
+        with _pool_lock:
+            can_open = _open_connections < DB_POOL_SIZE
+            if can_open:
+                _open_connections += 1
+        if can_open:
+            try:
+                return _connect()
+            except Exception:
+                with _pool_lock:
+                    _open_connections -= 1
+                raise
+        connection = _pool.get(timeout=DB_POOL_TIMEOUT)
+
+    if _is_healthy(connection):
+        return connection
+
+    # Replace a dead connection instead of handing it out
+    try:
+        connection.close()
+    except Exception:
+        pass
+    try:
+        return _connect()
+    except Exception:
+        with _pool_lock:
+            _open_connections -= 1
+        raise
+
+
+def _release(connection):
+    try:
+        connection.rollback()  # Never leak an open transaction to the next user
+        _pool.put(connection)
+    except Exception:
+        global _open_connections
+        with _pool_lock:
+            _open_connections -= 1
+
+
+@contextmanager
+def get_connection():
+    """Borrow a healthy connection from the process-wide pool."""
+    connection = _acquire()
+    try:
+        yield connection
+    finally:
+        _release(connection)
+
+
+@contextmanager
+def transaction():
+    """Yield a cursor whose statements commit together, or roll back on error."""
+    with get_connection() as connection:
+        try:
+            with connection.cursor() as cursor:
+                yield cursor
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+
+
+def initialize_schema(name, statements):
+    """Run DDL statements for `name` once per process."""
+    if name in _initialized_schemas:
+        return
+
+    with _schema_lock:
+        if name in _initialized_schemas:
+            return
+        with transaction() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+        _initialized_schemas.add(name)
+        print(f"Schema `{name}` is ready.")
+
+
+def close_all():
+    """Close every pooled connection."""
+    global _open_connections
+    while True:
+        try:
+            connection = _pool.get_nowait()
+        except queue.Empty:
+            break
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with _pool_lock:
+            _open_connections -= 1
+
+
+atexit.register(close_all)
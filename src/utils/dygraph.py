@@ -0,0 +1,59 @@
+import re
+import numpy as np
+
+# One data row of a Dygraph literal: [new Date("2024/05/08"),1.5,2,null,...]
+DYGRAPH_START = re.compile(r'\[\s*\[\s*new Date\(')
+DYGRAPH_ROW = re.compile(r'\s*\[\s*new Date\(\s*"(\d{4})/(\d{1,2})/(\d{1,2})"\s*\)\s*,([^\[\]]*)\]')
+
+
+def find_dygraph_data(text):
+    """Offset of the `[[new Date(...` array literal that feeds `new Dygraph`, or -1."""
+    anchor = text.find("new Dygraph")
+    if anchor == -1:
+        return -1
+    match = DYGRAPH_START.search(text, anchor)
+    return match.start() if match else -1
+
+
+def parse_dygraph(text, start=None):
+    """Parse a Dygraph `[[new Date("Y/m/d"), v1, v2, ...], ...]` literal without eval.
+
+    Rows are tokenized one at a time from `start` (found automatically by default) until
+    the closing `]]`. Returns (dates, values): a datetime64[D] vector and a float matrix
+    with one row per date and NaN for `null` cells.
+    """
+    if start is None:
+        start = find_dygraph_data(text)
+    if start < 0:
+        raise ValueError("No Dygraph data found")
+
+    dates = []
+    cells = []
+    position = start + 1  # Skip the outer '['
+    while True:
+        match = DYGRAPH_ROW.match(text, position)
+        if not match:
+            break
+        year, month, day, row = match.groups()
+        dates.append(f"{year}-{int(month):02d}-{int(day):02d}")
+        cells.append(row)
+        position = match.end()
+        # Rows are separated by ',' and the array ends at ']'
+        while position < len(text) and text[position] in " \t\r\n":
+            position += 1
+        if position >= len(text) or text[position] != ",":
+            break
+        position += 1
+
+    if not dates:
+        raise ValueError("Dygraph data has no rows")
+
+    width = cells[0].count(",") + 1
+    values = np.array(
+        ",".join(cells).replace("null", "nan").split(","),
+        dtype=float,
+    )
+    if values.size != len(dates) * width:
+        raise ValueError("Dygraph rows have different numbers of values")
+
+    return np.array(dates, dtype="datetime64[D]"), values.reshape(len(dates), width)
@@ -0,0 +1,312 @@
+import json
+import re
+from datetime import datetime
+from typing import NamedTuple
+from bs4 import BeautifulSoup, SoupStrainer
+
+# lxml is much faster than html.parser; fall back if it isn't installed
+try:
+    import lxml  # noqa: F401
+    PARSER = "lxml"
+except ImportError:
+    PARSER = "html.parser"
+
+
+class Holding(NamedTuple):
+    symbol: str
+    amount: float
+
+
+class CongressListing(NamedTuple):
+    name: str
+    href: str
+    volume: float
+    cells: tuple  # Text of every cell in the row, unrounded
+
+
+class CongressTrade(NamedTuple):
+    symbol: str
+    trade_type: str  # "Buy" or "Sell"
+    date: datetime
+
+
+class OrderBook(NamedTuple):
+    network_value: str      # e.g. "123,456.78 WBTC"
+    custody_value_btc: str  # e.g. "123,456.78 BTC"
+    custody_value_usd: str
+    network_amount: float
+    custody_amount: float
+
+
+class NewsItem(NamedTuple):
+    title: str
+    content: str
+    href: str
+    breaking: bool
+
+
+def class_token(*names, prefix=False):
+    """Regex matching any of the class names as a whole token of a class attribute.
+
+    While parsing, SoupStrainer sees the raw attribute ("item v-card v-sheet"), so a plain
+    string only matches single-class elements; this matches wherever the token appears.
+    """
+    alternatives = "|".join(re.escape(name) for name in names)
+    ending = r"\S*" if prefix else ""
+    return re.compile(rf"(?:^|\s)(?:{alternatives}){ending}(?:\s|$)")
+
+
+# Only these subtrees are built; the rest of each document is skipped by the parser
+ARKHAM_CONTAINER_CLASS = class_token("Portfolio_holdingsContainer", prefix=True)
+ARKHAM_SYMBOL_CLASS = class_token("Portfolio_holdingsSymbol", prefix=True)
+ARKHAM_HOLDINGS = SoupStrainer("div", class_=ARKHAM_CONTAINER_CLASS)
+CONGRESS_TABLES = SoupStrainer("div", class_=class_token("table-outer"))
+CONGRESS_TRADE_TABLE = SoupStrainer("table", id="tradeTable")
+ORDER_BOOK_CARDS = SoupStrainer(class_=class_token("network", "custody"))
+MINING_COST_CARDS = SoupStrainer("div", class_=class_token("v-card"))
+BINANCE_NEWS = SoupStrainer("div", class_=class_token("css-vurnku"))
+
+AMOUNT_SUFFIXES = {"T": 1_000_000_000_000, "B": 1_000_000_000, "M": 1_000_000, "K": 1_000}
+
+
+def parse(html, strainer):
+    """Parse only the parts of `html` matched by `strainer`."""
+    return BeautifulSoup(html, PARSER, parse_only=strainer)
+
+
+def parse_amount(text):
+    """Convert '$1.5M', '12,345', '2.1B' into a float. Raises ValueError."""
+    clean = text.replace("$", "").replace(",", "").strip()
+    multiplier = AMOUNT_SUFFIXES.get(clean[-1:], 1)
+    if multiplier != 1:
+        clean = clean[:-1]
+    return float(clean) * multiplier
+
+
+# **📌 Arkham entity holdings**
+def arkham_holdings(soup):
+    holdings = []
+    seen = set()
+    for container in soup.find_all("div", class_=ARKHAM_CONTAINER_CLASS):
+        symbol_span = container.find("span", class_=ARKHAM_SYMBOL_CLASS)
+        amount_span = container.find("span")
+        if not symbol_span or not amount_span:
+            continue
+        symbol = symbol_span.get_text(strip=True)
+        if symbol in seen:
+            continue
+        try:
+            amount = parse_amount(amount_span.get_text(strip=True))
+        except ValueError:
+            print(f"Error converting amount for {symbol}: {amount_span.get_text(strip=True)}")
+            continue
+        if amount < 0:
+            print(f"Negative amount for {symbol}: {amount}")
+            continue
+        seen.add(symbol)
+        holdings.append(Holding(symbol, amount))
+    return holdings
+
+
+def extract_arkham_holdings(html):
+    return arkham_holdings(parse(html, ARKHAM_HOLDINGS))
+
+
+# **📌 QuiverQuant congress listing**
+def congress_listings(soup):
+    table_outers = soup.find_all("div", class_="table-outer")
+    if len(table_outers) < 2 or not table_outers[1].find("table"):
+        return None
+
+    listings = []
+    for row in table_outers[1].find("table").find_all("tr")[1:]:  # Skip header row
+        cols = row.find_all("td")
+        if len(cols) < 3:
+            continue
+        link = cols[0].find("a")
+        name = cols[0].find("strong")
+        volume = cols[2].find("a")
+        if not link or not name or not volume:
+            continue
+        try:
+            amount = parse_amount(volume.text)
+        except ValueError:
+            amount = 0
+        cells = tuple(col.get_text(" ", strip=True) for col in cols)
+        listings.append(CongressListing(name.text.strip(), link.get("href", ""), amount, cells))
+    return listings
+
+
+def extract_congress_listings(html):
+    return congress_listings(parse(html, CONGRESS_TABLES))
+
+
+# **📌 QuiverQuant politician trades**
+def congress_trade_type(text):
+    """Purchases are "Buy"; sales, exchanges and every other transaction count as "Sell"."""
+    return "Buy" if text.strip() == "Purchase" else "Sell"
+
+
+def congress_trades(soup):
+    trade_table = soup.find("table", id="tradeTable")
+    if not trade_table:
+        return None
+
+    trades = []
+    for row in trade_table.find_all("tr")[1:]:  # Skip header
+        tds = row.find_all("td")
+        if len(tds) < 4:
+            continue
+        symbol_div = tds[0].find("div")
+        symbol_a = symbol_div.find("a", class_="positive") if symbol_div else None
+        type_strong = tds[1].find("strong")
+        date_strong = tds[3].find("strong")
+        if not symbol_a or not type_strong or not date_strong:
+            continue
+        try:
+            date = datetime.strptime(date_strong.text.strip(), "%b %d, %Y")
+        except ValueError:
+            continue
+        trades.append(CongressTrade(symbol_a.text.strip(), congress_trade_type(type_strong.text), date))
+    return trades
+
+
+TRADE_DATA_START = re.compile(r"(?:let|var|const)\s+tradeData\s*=\s*\[")
+# Field names of QuiverQuant's congress trading records. TransactionDate is when the trade
+# happened (the table's "Traded" column), not when it was filed (ReportDate)
+TRADE_DATA_FIELDS = {"symbol": "Ticker", "trade_type": "Transaction", "date": "TransactionDate"}
+TRADE_TRAILING_COMMA = re.compile(r",\s*([\]}])")
+ISO_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}")
+
+
+def find_js_array(text, start):
+    """The array literal opening at text[start] ('['), matched bracket by bracket, skipping strings."""
+    depth = 0
+    quote = None
+    position = start
+    while position < len(text):
+        char = text[position]
+        if quote:
+            if char == "\\":
+                position += 1
+            elif char == quote:
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char == "[":
+            depth += 1
+        elif char == "]":
+            depth -= 1
+            if depth == 0:
+                return text[start:position + 1]
+        position += 1
+    return None
+
+
+def trade_from_js(item):
+    """A CongressTrade from one tradeData record, or None if it doesn't have the expected fields."""
+    if not isinstance(item, dict):
+        return None
+    symbol, trade_type, date = (item.get(field) for field in TRADE_DATA_FIELDS.values())
+    if not isinstance(symbol, str) or not symbol.strip() or not isinstance(trade_type, str):
+        return None
+    if not isinstance(date, str) or not ISO_DATE.match(date):
+        return None
+    try:
+        date = datetime.strptime(date[:10], "%Y-%m-%d")  # Drop any time part
+    except ValueError:
+        return None
+    return CongressTrade(symbol.strip(), congress_trade_type(trade_type), date)
+
+
+def congress_trade_data(html):
+    """Trades from the page's embedded `tradeData` array, newest first; None if it isn't there."""
+    match = TRADE_DATA_START.search(html)
+    if not match:
+        return None
+    literal = find_js_array(html, match.end() - 1)
+    if literal is None:
+        return None
+    try:
+        items = json.loads(literal)
+    except ValueError:
+        try:
+            items = json.loads(TRADE_TRAILING_COMMA.sub(r"\1", literal))
+        except ValueError:
+            return None
+
+    trades = list(map(trade_from_js, items)) if isinstance(items, list) else [None]
+    if None in trades:
+        return None  # Not the layout we know; let the table parser handle the page
+    return sorted(trades, key=lambda trade: trade.date, reverse=True)
+
+
+def extract_congress_trade_table(html):
+    return congress_trades(parse(html, CONGRESS_TRADE_TABLE))
+
+
+def extract_congress_trades(html):
+    """Trades from the embedded tradeData array, falling back to the rendered #tradeTable."""
+    trades = congress_trade_data(html)
+    if trades is not None:
+        return trades
+    return extract_congress_trade_table(html)
+
+
+# **📌 wbtc.network order book**
+def order_book(soup):
+    network_amount = soup.select_one(".network .network-amount span")
+    custody_amount = soup.select_one(".custody .btc-usd-amount span")
+    if not network_amount or not custody_amount:
+        raise ValueError("Could not find order book values")
+
+    network_value = network_amount.text.strip()
+    custody_value_btc, custody_value_usd = custody_amount.text.strip().split("  ")[:2]
+    return OrderBook(
+        network_value,
+        custody_value_btc,
+        custody_value_usd,
+        float(network_value.replace("WBTC", "").replace(",", "").strip()),
+        float(custody_value_btc.replace("BTC", "").replace(",", "").strip()),
+    )
+
+
+def extract_order_book(html):
+    return order_book(parse(html, ORDER_BOOK_CARDS))
+
+
+# **📌 CCAF mining cost**
+def mining_cost(soup):
+    """Bitcoin average mining cost (the third card's h2)."""
+    cost_elements = soup.select("div.item.v-card.v-sheet.theme--light h2")
+    if len(cost_elements) < 3:
+        raise ValueError("Could not find mining cost element")
+    return parse_amount(cost_elements[2].text)
+
+
+def extract_mining_cost(html):
+    return mining_cost(parse(html, MINING_COST_CARDS))
+
+
+# **📌 Binance Square news**
+def binance_news(soup):
+    news = []
+    for container in soup.find_all("div", class_="css-vurnku"):
+        news_link = container.find("a", style="display:block;margin-bottom:8px")
+        if not news_link:
+            continue
+        title_element = news_link.find("h3")
+        content_element = news_link.find("div", class_="css-10lrpzu")
+        if not title_element or not content_element:
+            continue
+        news.append(NewsItem(
+            title_element.text.strip(),
+            content_element.text.strip(),
+            news_link.get("href", ""),
+            "css-ifogq4" in title_element.get("class", []),
+        ))
+    return news
+
+
+def extract_binance_news(html):
+    return binance_news(parse(html, BINANCE_NEWS))
@@ -0,0 +1,93 @@
+from typing import NamedTuple
+import numpy as np
+
+DEFAULT_HORIZONS = (1, 7, 30)  # Days
+
+class HoldingChanges(NamedTuple):
+    """Latest day-over-day movement of every symbol, as arrays aligned with `symbols`."""
+    symbols: list
+    change: np.ndarray         # today - yesterday, in units of the asset
+    usd_change: np.ndarray     # change x current price (NaN without a price)
+    pct_change: np.ndarray
+    streak_length: np.ndarray  # days the holding has kept moving in today's direction
+    streak_change: np.ndarray  # % change over the whole streak
+    valid: np.ndarray          # today, yesterday and a price are all known
+
+
+def holdings_matrix(df, symbols):
+    """Oldest-first date x symbol float matrix for the symbols present in `df`."""
+    symbols = [symbol for symbol in symbols if symbol in df.columns]
+    matrix = df[symbols].apply(lambda column: column.astype(float)).to_numpy(dtype=float)
+    return symbols, matrix
+
+
+def compute_changes(symbols, matrix, prices):
+    """Daily, USD and % change plus streaks for every column of `matrix` in one pass.
+
+    `matrix` has one row per day, oldest first; `prices` maps symbol -> current price.
+    A streak counts yesterday plus every earlier day (walking back from the day before
+    yesterday) whose value today's holding has moved away from in the same direction
+    as today's change, stopping at the first gap or reversal.
+    """
+    days, count = matrix.shape
+    if days < 2:
+        empty = np.full(count, np.nan)
+        return HoldingChanges(symbols, empty, empty, empty, np.ones(count, dtype=int), empty,
+                              np.zeros(count, dtype=bool))
+
+    price = np.array([prices.get(symbol, np.nan) for symbol in symbols], dtype=float)
+    today = matrix[-1]
+    yesterday = matrix[-2]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = today - yesterday
+        usd_change = change * price
+        pct_change = np.where(yesterday == 0, 0.0, change / yesterday * 100)
+
+        # Newest to oldest, starting the day before yesterday
+        earlier = matrix[-3::-1]
+        direction = np.sign(pct_change)
+        continues = (
+            ~np.isnan(earlier)
+            & (earlier != 0)
+            & (direction != 0)
+            & (np.sign(today - earlier) * np.sign(earlier) == direction)
+        )
+        extra_days = np.cumprod(continues, axis=0).sum(axis=0)
+
+        streak_length = 1 + extra_days
+        streak_start = matrix[days - 2 - extra_days, np.arange(count)]
+        streak_change = (today - streak_start) / streak_start * 100
+
+    valid = ~np.isnan(today) & ~np.isnan(yesterday) & ~np.isnan(price)
+    return HoldingChanges(symbols, change, usd_change, pct_change, streak_length, streak_change, valid)
+
+
+def top_movers(changes):
+    """Indices of the largest USD increase and decrease (None when there is none)."""
+    usd_change = np.where(changes.valid, changes.usd_change, 0.0)
+    increase = int(np.argmax(usd_change)) if (usd_change > 0).any() else None
+    decrease = int(np.argmin(usd_change)) if (usd_change < 0).any() else None
+    return increase, decrease
+
+
+def horizon_changes(dates, matrix, horizons=DEFAULT_HORIZONS):
+    """Change of every symbol over each horizon (in days), as {horizon: array}.
+
+    `dates` is the sorted, oldest-first date of each row of `matrix`. The baseline for a
+    horizon is the latest row on or before the newest date minus that many days, found
+    by binary search, so any horizon costs one lookup plus one vector subtraction.
+    Symbols without a baseline (history too short or a gap) get NaN.
+    """
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    horizons = list(horizons)
+    targets = dates[-1] - np.array(horizons, dtype="timedelta64[D]")
+    baselines = np.searchsorted(dates, targets, side="right") - 1
+
+    changes = {}
+    for horizon, baseline in zip(horizons, baselines):
+        if baseline < 0:
+            changes[horizon] = np.full(matrix.shape[1], np.nan)
+        else:
+            changes[horizon] = matrix[-1] - matrix[baseline]
+    return changes
@@ -0,0 +1,39 @@
+import json
+import os
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Local state shared by runs on this machine (defaults to <repo>/.cache)
+CACHE_DIR = Path(os.getenv("CACHE_DIR", Path(__file__).resolve().parents[2] / ".cache"))
+
+
+def cache_path(name):
+    """Path of a file inside the cache directory, creating parent folders."""
+    path = CACHE_DIR / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def load_json(name, default=None):
+    """Read a JSON cache file, returning `default` if it's missing or corrupt."""
+    path = CACHE_DIR / name
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return default
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable cache file {path}: {e}")
+        return default
+
+
+def save_json(name, data):
+    """Atomically write a JSON cache file."""
+    path = cache_path(name)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(data, file, default=str)
+    os.replace(tmp_path, path)
@@ -0,0 +1,100 @@
+import gzip
+import hashlib
+import os
+import threading
+from datetime import datetime
+from dotenv import load_dotenv
+from utils.local_cache import CACHE_DIR, cache_path, load_json, save_json
+
+# Load environment variables
+load_dotenv()
+
+# PAGE_REPLAY=1 serves every archived fetch from PAGE_REPLAY_DATE's archive (default today)
+# instead of the browser; pages missing from the archive come back as None. Replay is
+# read-only: callers skip their database writes so old pages never overwrite real data
+PAGE_REPLAY = os.getenv("PAGE_REPLAY", "").lower() in ("1", "true", "yes")
+PAGE_REPLAY_DATE = os.getenv("PAGE_REPLAY_DATE")
+PAGE_ARCHIVE = os.getenv("PAGE_ARCHIVE", "1").lower() in ("1", "true", "yes")
+
+# Compressed pages are stored once per distinct content; a small index per day maps url -> digest
+OBJECTS_DIR = "pages/objects"
+INDEX_DIR = "pages/index"
+
+_index_lock = threading.Lock()
+
+
+def _today():
+    return datetime.now().strftime("%Y-%m-%d")
+
+
+def _object_name(digest):
+    return f"{OBJECTS_DIR}/{digest[:2]}/{digest}.gz"
+
+
+def _index_name(date):
+    return f"{INDEX_DIR}/{date}.json"
+
+
+def snapshot_date():
+    """Day the fetched data belongs to: PAGE_REPLAY_DATE when replaying it, otherwise today."""
+    return PAGE_REPLAY_DATE if PAGE_REPLAY and PAGE_REPLAY_DATE else _today()
+
+
+def archive_page(url, content, site=None, date=None):
+    """Store a fetched page (HTML or JSON text) under its url for the day. Returns its digest."""
+    if not PAGE_ARCHIVE or PAGE_REPLAY or not content:
+        return None
+
+    date = date or _today()
+    data = content.encode("utf-8")
+    digest = hashlib.sha256(data).hexdigest()
+
+    try:
+        path = cache_path(_object_name(digest))
+        if not path.exists():
+            tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+            with gzip.open(tmp_path, "wb") as file:
+                file.write(data)
+            os.replace(tmp_path, path)
+
+        with _index_lock:
+            index = load_json(_index_name(date), {})
+            index[url] = {"sha256": digest, "site": site, "size": len(data)}
+            save_json(_index_name(date), index)
+    except OSError as e:
+        print(f"Could not archive {url}: {e}")
+        return None
+    return digest
+
+
+def load_page(url, date=None):
+    """Archived content of `url` for the day, or None."""
+    date = date or PAGE_REPLAY_DATE or _today()
+    entry = load_json(_index_name(date), {}).get(url)
+    if not entry:
+        return None
+    try:
+        with gzip.open(CACHE_DIR / _object_name(entry["sha256"]), "rb") as file:
+            return file.read().decode("utf-8")
+    except OSError as e:
+        print(f"Could not read archived page {url}: {e}")
+        return None
+
+
+def replay_page(url):
+    """The page to serve in replay mode, with a note when it was never archived."""
+    content = load_page(url)
+    if content is None:
+        print(f"No archived page for {url} on {PAGE_REPLAY_DATE or _today()}")
+    return content
+
+
+def iter_archive(date=None, site=None):
+    """(site, url, content) for every page archived on the day, optionally for one site."""
+    date = date or PAGE_REPLAY_DATE or _today()
+    for url, entry in load_json(_index_name(date), {}).items():
+        if site and entry.get("site") != site:
+            continue
+        content = load_page(url, date)
+        if content is not None:
+            yield entry.get("site"), url, content
@@ -0,0 +1,107 @@
+import threading
+import time
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+from utils.local_cache import load_json, save_json
+
+# Per-site readiness: a JS expression that is truthy once the data we scrape is on the page,
+# and the longest we are ever willing to wait for it
+READINESS = {
+    "arkham": {
+        "condition": "document.querySelector(\"div[class*='Portfolio_holdingsContainer']\") !== null",
+        "max_timeout": 30,
+    },
+    "quiverquant_listing": {
+        "condition": "(function () { var t = document.querySelectorAll('div.table-outer'); "
+                     "return t.length >= 2 && t[1].querySelector('table') !== null; })()",
+        "max_timeout": 40,
+    },
+    "quiverquant_trader": {
+        "condition": "Array.prototype.some.call(document.scripts, "
+                     "function (s) { return s.text.indexOf('let tradeData = [') !== -1; })",
+        "max_timeout": 40,
+    },
+    "wbtc": {
+        "condition": "document.querySelector('.network .network-amount span') !== null",
+        "max_timeout": 20,
+    },
+    "ccaf": {
+        "condition": "(function () { var h = document.querySelectorAll('div.item.v-card.v-sheet.theme--light h2'); "
+                     "return h.length >= 3 && h[2].textContent.trim() !== ''; })()",
+        "max_timeout": 40,
+    },
+}
+
+MIN_TIMEOUT = 5           # Never wait less than this, however fast the site has been
+TIMEOUT_HEADROOM = 2      # Adaptive timeout = headroom x slowest recent wait
+WAIT_HISTORY = 20         # Recorded waits kept per site
+STATS_FILE = "page_waits.json"
+
+_wait_stats = None
+_stats_lock = threading.Lock()
+
+
+def _get_stats():
+    global _wait_stats
+    if _wait_stats is None:
+        _wait_stats = load_json(STATS_FILE, {})
+    return _wait_stats
+
+
+def get_timeout(site):
+    """Adaptive timeout from recent waits, bounded by the site's max_timeout."""
+    max_timeout = READINESS[site]["max_timeout"]
+    with _stats_lock:
+        history = _get_stats().get(site, [])
+    if not history:
+        return max_timeout
+    return min(max_timeout, max(MIN_TIMEOUT, TIMEOUT_HEADROOM * max(entry["seconds"] for entry in history)))
+
+
+def record_wait(site, seconds, ready):
+    """Remember how long a site took (timeouts count as slow samples)."""
+    with _stats_lock:
+        stats = _get_stats()
+        history = stats.setdefault(site, [])
+        history.append({"seconds": round(seconds, 2), "ready": ready})
+        del history[:-WAIT_HISTORY]
+        try:
+            save_json(STATS_FILE, stats)
+        except OSError as e:
+            print(f"Could not save page wait stats: {e}")
+
+
+def _wait(driver, condition, timeout):
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.25).until(
+            lambda d: d.execute_script(f"return !!({condition});")
+        )
+        return True
+    except TimeoutException:
+        return False
+
+
+def wait_until_ready(driver, site, extend=True):
+    """Block until the site's readiness condition holds. Returns False on timeout.
+
+    The adaptive timeout is tried first; with `extend` (for callers that don't retry) a miss
+    keeps waiting up to the site's max_timeout instead of failing on one slow load.
+    """
+    condition = READINESS[site]["condition"]
+    max_timeout = READINESS[site]["max_timeout"]
+    timeout = get_timeout(site)
+    start = time.monotonic()
+
+    ready = _wait(driver, condition, timeout)
+    if not ready and extend and timeout < max_timeout:
+        print(f"{site} not ready after {timeout:.0f}s, waiting up to {max_timeout}s")
+        ready = _wait(driver, condition, max_timeout - timeout)
+        timeout = max_timeout
+
+    elapsed = time.monotonic() - start
+    record_wait(site, elapsed, ready)
+    if ready:
+        print(f"{site} ready after {elapsed:.1f}s")
+    else:
+        print(f"{site} not ready after {timeout:.0f}s")
+    return ready
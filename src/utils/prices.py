@@ -0,0 +1,63 @@
+import json
+import os
+import threading
+import time
+import ccxt
+from dotenv import load_dotenv
+from utils.page_archive import PAGE_REPLAY, archive_page, replay_page
+
+# Load environment variables
+load_dotenv()
+
+PRICE_TTL = float(os.getenv("PRICE_TTL", 60))  # Seconds a ticker snapshot stays fresh
+DEFAULT_QUOTE = "USDT"
+TICKERS_ARCHIVE_KEY = "binance:tickers"  # Latest snapshot of the day, so replays price like the original run
+
+_exchange = None
+_last_prices = {}      # "BTC/USDT" -> last price, from the latest snapshot
+_snapshot_time = 0.0
+_prices_lock = threading.Lock()
+
+
+def _refresh_prices():
+    """Fetch every Binance ticker in one request and replace the snapshot."""
+    global _exchange, _snapshot_time
+    if PAGE_REPLAY:
+        # Never call Binance while replaying; prices come from the replayed day's archive
+        archived = replay_page(TICKERS_ARCHIVE_KEY)
+        _last_prices.clear()
+        _last_prices.update(json.loads(archived) if archived else {})
+        _snapshot_time = time.monotonic()
+        return
+
+    if _exchange is None:
+        _exchange = ccxt.binance()
+
+    tickers = _exchange.fetch_tickers()
+    _last_prices.clear()
+    for pair, ticker in tickers.items():
+        if ticker.get('last') is not None:
+            _last_prices[pair] = float(ticker['last'])
+    _snapshot_time = time.monotonic()
+    archive_page(TICKERS_ARCHIVE_KEY, json.dumps(_last_prices), "binance")
+
+
+def get_prices(symbols, quote=DEFAULT_QUOTE, ttl=PRICE_TTL):
+    """Return {symbol: last price} for the symbols Binance quotes against `quote`."""
+    with _prices_lock:
+        if time.monotonic() - _snapshot_time > ttl:
+            try:
+                _refresh_prices()
+            except Exception as e:
+                print(f"Error fetching prices from Binance: {e}")
+
+        return {
+            symbol: _last_prices[f"{symbol}/{quote}"]
+            for symbol in symbols
+            if f"{symbol}/{quote}" in _last_prices
+        }
+
+
+def get_price(symbol, quote=DEFAULT_QUOTE, ttl=PRICE_TTL):
+    """Last price of one symbol, or None if it isn't available."""
+    return get_prices([symbol], quote, ttl).get(symbol)
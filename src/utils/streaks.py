@@ -0,0 +1,40 @@
+from typing import NamedTuple
+import numpy as np
+import pandas as pd
+
+
+class SignRuns(NamedTuple):
+    """Run-length encoding of the sign of every column, aligned with the input frame."""
+    sign: pd.DataFrame             # +1 rising, -1 falling, 0 flat or missing
+    length: pd.DataFrame           # days the current run has lasted, including this one
+    previous_sign: pd.DataFrame    # sign of the run before the current one (0 if none)
+    previous_length: pd.DataFrame  # its full length (0 if none)
+
+
+def sign_runs(changes):
+    """Encode the sign runs of every column of `changes` (e.g. a diff) in one pass."""
+    signs = np.sign(np.nan_to_num(changes.to_numpy(dtype=float)))
+    rows = np.arange(len(signs))[:, None]
+    columns = np.arange(signs.shape[1])
+
+    new_run = np.ones(signs.shape, dtype=bool)
+    new_run[1:] = signs[1:] != signs[:-1]
+    run_start = np.maximum.accumulate(np.where(new_run, rows, 0), axis=0)
+    length = rows - run_start + 1
+
+    # The previous run ends the row before the current one starts
+    previous_end = run_start - 1
+    has_previous = previous_end >= 0
+    previous_end = np.where(has_previous, previous_end, 0)
+    previous_sign = np.where(has_previous, signs[previous_end, columns], 0)
+    previous_length = np.where(has_previous, length[previous_end, columns], 0)
+
+    def frame(values):
+        return pd.DataFrame(values.astype(int), index=changes.index, columns=changes.columns)
+
+    return SignRuns(frame(signs), frame(length), frame(previous_sign), frame(previous_length))
+
+
+def reversals(runs):
+    """True where a direction flips: a new non-flat run right after one in the opposite direction."""
+    return (runs.length == 1) & (runs.sign != 0) & (runs.previous_sign == -runs.sign)